@@ -1,15 +1,24 @@
 import os
 import time
 import random
+import asyncio
+import queue
+import re
+import threading
+from concurrent.futures import ProcessPoolExecutor
+import httpx
 import pandas as pd
-from io import StringIO
-from bs4 import BeautifulSoup, Comment
+import lxml.html
 from selenium import webdriver
 from selenium.webdriver.chrome.options import Options
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from typing import List, Dict, Optional
+from data_pipelines._fbref_tables import MAX_TABLE_BYTES, table_to_dataframe
+
+# Matches any <table> carrying an id, capturing the id
+TABLE_PATTERN = re.compile(r'<table\b[^>]*\bid="([^"]+)".*?</table>', re.DOTALL)
 
 # --- All helper functions (get_proxy_list, get_random_user_agent, etc.) remain the same ---
 
@@ -53,53 +62,148 @@ def setup_webdriver(proxy: Optional[str], user_agent: str) -> webdriver.Chrome:
     driver = webdriver.Chrome(options=chrome_options)
     return driver
 
-def fetch_page_source(url: str, proxies: List[str], max_retries: int = 3) -> Optional[str]:
+def create_http_client(proxies: List[str]) -> httpx.AsyncClient:
+    """Builds the shared HTTP/2 client used for every FBref request (one connection pool per run)."""
+    proxy = random.choice(proxies) if proxies else None
+    # Keep TLS connections to FBref alive across seasons, and let the transport retry failed
+    # connection attempts itself before fetch_page_source's HTTP-level backoff kicks in
+    limits = httpx.Limits(max_connections=16, max_keepalive_connections=8, keepalive_expiry=30)
+    transport = httpx.AsyncHTTPTransport(http2=True, proxy=proxy, limits=limits, retries=3)
+    return httpx.AsyncClient(transport=transport, timeout=30, follow_redirects=True)
+
+class WebDriverPool:
+    """
+    Keeps up to `size` warm WebDriver instances so browser fetches don't pay the Chrome
+    startup cost on every URL. The queue holds one entry per slot: a driver, or None for a slot
+    whose driver is launched on first demand. Drivers are only recycled when they hit a hard failure.
+    """
+
+    def __init__(self, proxies: List[str], size: int = 4):
+        self.proxies = proxies
+        self.size = size
+        self._idle = queue.Queue()
+        for _ in range(size):
+            self._idle.put(None)
+        self._drivers = []
+        self._lock = threading.Lock()
+
+    def __enter__(self) -> "WebDriverPool":
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        with self._lock:
+            for driver in self._drivers:
+                try:
+                    driver.quit()
+                except Exception as e:
+                    print(f"Error while shutting down a pooled driver: {e}")
+            self._drivers.clear()
+
+    def acquire(self) -> webdriver.Chrome:
+        """Waits for a free slot and returns its driver, launching one if the slot is empty."""
+        driver = self._idle.get()
+        if driver is None:
+            proxy = random.choice(self.proxies) if self.proxies else None
+            try:
+                driver = setup_webdriver(proxy, get_random_user_agent())
+            except Exception:
+                # The slot stays free for the next caller
+                self._idle.put(None)
+                raise
+            with self._lock:
+                self._drivers.append(driver)
+        return driver
+
+    def release(self, driver: webdriver.Chrome) -> None:
+        """Resets the driver's session state and hands it back to the pool."""
+        try:
+            driver.delete_all_cookies()
+        except Exception as e:
+            # A crashed or hung browser can't be reset; replace it rather than losing its slot
+            print(f"Could not reset a pooled driver, replacing it: {e}")
+            self.discard(driver)
+            return
+        self._idle.put(driver)
+
+    def discard(self, driver: webdriver.Chrome) -> None:
+        """Quits a broken driver and frees its slot, so the next acquire() launches a fresh one."""
+        with self._lock:
+            if driver in self._drivers:
+                self._drivers.remove(driver)
+        try:
+            driver.quit()
+        except Exception:
+            pass
+        self._idle.put(None)
+
+def fetch_page_source_with_browser(url: str, pool: WebDriverPool) -> Optional[str]:
+    """Fallback fetch through a pooled headless browser for when FBref refuses plain HTTP clients."""
+    try:
+        driver = pool.acquire()
+    except Exception as e:
+        print(f"Could not launch a browser for {url}: {e}")
+        return None
+    healthy = False
+    try:
+        driver.get(url)
+        WebDriverWait(driver, 20).until(
+            EC.presence_of_element_located((By.CSS_SELECTOR, "div.table_container"))
+        )
+        page_source = driver.page_source
+        healthy = True
+        return page_source
+    except Exception as e:
+        print(f"Browser fallback failed for {url}: {e}")
+        return None
+    finally:
+        # Every acquired driver goes back, or is replaced, so no pool slot is ever lost
+        if healthy:
+            pool.release(driver)
+        else:
+            pool.discard(driver)
+
+async def fetch_page_source(client: httpx.AsyncClient, url: str, pool: WebDriverPool, max_retries: int = 3) -> Optional[str]:
     """
-    Fetches the full page source of a URL using Selenium with proxy/UA rotation and retry logic.
+    Fetches the page source of a URL over HTTP with UA rotation and exponential backoff.
+    FBref stats pages are server-rendered (extra tables live in HTML comments), so no browser
+    is needed unless every HTTP attempt is refused.
     """
     last_exception = None
     for attempt in range(max_retries):
         print(f"Attempt {attempt + 1} of {max_retries} to fetch {url}")
-        proxy = random.choice(proxies) if proxies else None
-        user_agent = get_random_user_agent()
-        driver = None
         try:
-            driver = setup_webdriver(proxy, user_agent)
-            driver.get(url)
-            WebDriverWait(driver, 20).until(
-                EC.presence_of_element_located((By.CSS_SELECTOR, "div.table_container"))
-            )
-            return driver.page_source
-        except Exception as e:
+            response = await client.get(url, headers={'User-Agent': get_random_user_agent()})
+            response.raise_for_status()
+            return response.text
+        except httpx.HTTPError as e:
             print(f"An error occurred on attempt {attempt + 1}: {e}")
             last_exception = e
-            time.sleep(5 * (attempt + 1))
-        finally:
-            if driver:
-                driver.quit()
-    print(f"Failed to fetch URL after {max_retries} attempts. Last error: {last_exception}")
-    return None
+            await asyncio.sleep(5 * 2 ** attempt)
+    print(f"Failed to fetch URL over HTTP after {max_retries} attempts. Last error: {last_exception}")
+    print("Falling back to a headless browser...")
+    return await asyncio.to_thread(fetch_page_source_with_browser, url, pool)
 
 def parse_tables_from_html(html: str, table_ids: List[str]) -> Dict[str, pd.DataFrame]:
     """Parses specified tables from HTML source, handling commented-out tables."""
-    soup = BeautifulSoup(html, 'html.parser')
+    # Slice each table's markup straight out of the raw page. Regex matching also sees through
+    # the HTML comments FBref hides secondary tables in, so lxml only parses a few KB per table.
+    # One scan collects every requested table and stops as soon as the last one is found.
+    wanted = set(table_ids)
+    matches = {}
+    for match in TABLE_PATTERN.finditer(html):
+        if match.group(1) in wanted and match.group(1) not in matches:
+            matches[match.group(1)] = match
+            if len(matches) == len(wanted):
+                break
     dataframes = {}
     for table_id in table_ids:
-        table_div = soup.find('div', id=f'div_{table_id}')
-        if not table_div:
-            print(f"Warning: Could not find div for table_id '{table_id}'. Skipping.")
-            continue
-        comment = table_div.find(string=lambda text: isinstance(text, Comment))
-        if comment:
-            table_soup = BeautifulSoup(comment, 'html.parser')
-            table = table_soup.find('table', id=table_id)
-        else:
-            table = table_div.find('table', id=table_id)
-        if table:
-            # FIX 1: Use StringIO to handle pandas FutureWarning
-            df = pd.read_html(StringIO(str(table)))[0]
+        match = matches.get(table_id)
+        if match and len(match.group(0)) > MAX_TABLE_BYTES:
+            print(f"Warning: Table '{table_id}' is {len(match.group(0))} bytes, over the {MAX_TABLE_BYTES} limit. Skipping.")
+        elif match:
+            df = table_to_dataframe(lxml.html.fromstring(match.group(0)))
             if isinstance(df.columns, pd.MultiIndex):
-                df.columns = ['_'.join(col).strip() for col in df.columns.values]
+                df.columns = ['_'.join(part for part in col if part).strip() for col in df.columns.values]
             
             # FIX 2: Dynamically find the player column to prevent KeyError
             player_col_name = None
@@ -121,9 +225,69 @@ def parse_tables_from_html(html: str, table_ids: List[str]) -> Dict[str, pd.Data
             
             dataframes[table_id] = df
         else:
-            print(f"Warning: Could not find table '{table_id}' within its div.")
+            print(f"Warning: Could not find table '{table_id}' in the page source. Skipping.")
     return dataframes
 
+def save_tables(tables: Dict[str, pd.DataFrame], season_dir: str) -> None:
+    """Writes each parsed table to its own Parquet file inside the season directory."""
+    for table_id, df in tables.items():
+        output_path = os.path.join(season_dir, f"{table_id}.parquet")
+        df.to_parquet(output_path, engine='pyarrow', compression='zstd', index=False)
+        print(f"Saved data to {output_path}")
+
+class RequestThrottle:
+    """
+    Spaces out request starts by a random 4-10 s gap, measured from the previous request
+    rather than slept on top of it, so time spent fetching and parsing counts toward the gap.
+    """
+
+    def __init__(self, min_gap: float = 4, max_gap: float = 10):
+        self.min_gap = min_gap
+        self.max_gap = max_gap
+        self._last_request = None
+        self._lock = asyncio.Lock()
+
+    async def wait(self) -> None:
+        async with self._lock:
+            if self._last_request is not None:
+                elapsed = time.monotonic() - self._last_request
+                await asyncio.sleep(max(0, random.uniform(self.min_gap, self.max_gap) - elapsed))
+            self._last_request = time.monotonic()
+
+async def scrape_season(client: httpx.AsyncClient, pool: WebDriverPool, parser: ProcessPoolExecutor, throttle: RequestThrottle,
+                        season_name: str, url: str, table_ids: List[str], output_dir: str) -> None:
+    """Fetches, parses and saves all requested tables for a single season."""
+    # Space out the season requests so we don't hit FBref with a burst of simultaneous hits
+    await throttle.wait()
+    print(f"\n--- Scraping Season: {season_name} ---")
+    season_dir = os.path.join(output_dir, season_name)
+    os.makedirs(season_dir, exist_ok=True)
+    html_content = await fetch_page_source(client, url, pool)
+    if not html_content:
+        print(f"Failed to retrieve page source for season {season_name}.")
+        return
+    # Parsing is CPU-bound, so hand it to a worker process and keep the event loop free for other seasons
+    loop = asyncio.get_running_loop()
+    tables = await loop.run_in_executor(parser, parse_tables_from_html, html_content, table_ids)
+    if tables:
+        save_tables(tables, season_dir)
+    else:
+        print(f"No tables could be parsed for season {season_name}.")
+
+async def scrape_all_seasons(seasons: Dict[str, str], table_ids: List[str], proxies: List[str], output_dir: str) -> None:
+    """
+    Scrapes every season concurrently over a single pooled HTTP client, sharing one browser pool
+    for fallbacks and one process pool for HTML parsing.
+    """
+    throttle = RequestThrottle()
+    workers = min(4, len(seasons))
+    with WebDriverPool(proxies, size=workers) as pool, ProcessPoolExecutor(max_workers=workers) as parser:
+        async with create_http_client(proxies) as client:
+            await asyncio.gather(*(
+                scrape_season(client, pool, parser, throttle, season_name, url, table_ids, output_dir)
+                for season_name, url in seasons.items()
+            ))
+
 def main():
     """Main execution function."""
     # --- Configuration ---
@@ -144,29 +308,11 @@ def main():
     PROXIES_FILE = "proxies.txt"
     OUTPUT_DIR = "raw_data"
 
-    # --- Execution (remains the same) ---
+    # --- Execution ---
     os.makedirs(OUTPUT_DIR, exist_ok=True)
     proxies = get_proxy_list(PROXIES_FILE)
 
-    for season_name, url in SEASONS.items():
-        print(f"\n--- Scraping Season: {season_name} ---")
-        season_dir = os.path.join(OUTPUT_DIR, season_name)
-        os.makedirs(season_dir, exist_ok=True)
-        html_content = fetch_page_source(url, proxies)
-        if html_content:
-            tables = parse_tables_from_html(html_content, TABLES_TO_SCRAPE)
-            if tables:
-                for table_id, df in tables.items():
-                    output_path = os.path.join(season_dir, f"{table_id}.csv")
-                    df.to_csv(output_path, index=False)
-                    print(f"Saved data to {output_path}")
-            else:
-                print(f"No tables could be parsed for season {season_name}.")
-        else:
-            print(f"Failed to retrieve page source for season {season_name}.")
-        sleep_time = random.uniform(4, 10)
-        print(f"Sleeping for {sleep_time:.2f} seconds before next season...")
-        time.sleep(sleep_time)
+    asyncio.run(scrape_all_seasons(SEASONS, TABLES_TO_SCRAPE, proxies, OUTPUT_DIR))
     print("\n--- Scraping process complete. ---")
 
 if __name__ == '__main__':
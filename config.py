@@ -1,3 +1,4 @@
+import functools
 import os
 import platform
 import shutil
@@ -31,27 +32,36 @@ TEAMS_CONFIG = {
 SEASONS_TO_SCRAPE = ["2023-2024", "2024-2025"]
 MOST_RECENT_SEASON = "2024-2025"
 OUTPUT_DIR = "raw_data/h2h"
+MAX_WORKERS = 4  # Team-season pages fetched at once; the shared limiter still caps the request rate
+REQUESTS_PER_MINUTE = 10  # FBREF's published limit for automated requests, across all workers
+ETAG_CACHE_FILE = "cache/intelligent_h2h_etags.json"  # URL -> ETag / Last-Modified / body hash from earlier runs
+HTML_CACHE_DIR = "cache/h2h_html"  # Last fetched page per team-season, reused when FBREF answers 304
 
 # --- Selenium Configuration ---
 MAX_RETRIES = 3
 RETRY_DELAY = 10  # seconds
-# Determine Chrome binary path based on OS
-chrome_binary_env = os.getenv('CHROME_BINARY')
-if chrome_binary_env:
-    CHROME_BINARY_PATH = chrome_binary_env
-else:
+
+
+@functools.lru_cache(maxsize=None)
+def get_chrome_binary():
+    """Locates the Chrome binary once per process, honouring the CHROME_BINARY env var."""
+    chrome_binary_env = os.getenv('CHROME_BINARY')
+    if chrome_binary_env:
+        return chrome_binary_env
     system = platform.system()
     if system == 'Windows':
-        CHROME_BINARY_PATH = "C:\\Program Files\\Google\\Chrome\\Application\\chrome.exe"
-    elif system == 'Darwin':  # macOS
-        CHROME_BINARY_PATH = "/Applications/Google Chrome.app/Contents/MacOS/Google Chrome"
-    elif system == 'Linux':
+        return "C:\\Program Files\\Google\\Chrome\\Application\\chrome.exe"
+    if system == 'Darwin':  # macOS
+        return "/Applications/Google Chrome.app/Contents/MacOS/Google Chrome"
+    if system == 'Linux':
+        # Check the usual install location directly before walking PATH for each candidate name
+        if os.path.isfile("/usr/bin/google-chrome"):
+            return "/usr/bin/google-chrome"
         for name in ['google-chrome', 'chrome', 'chromium', 'chromium-browser']:
             path = shutil.which(name)
             if path:
-                CHROME_BINARY_PATH = path
-                break
-        else:
-            CHROME_BINARY_PATH = None
-    else:
-        CHROME_BINARY_PATH = None
\ No newline at end of file
+                return path
+    return None
+
+
+CHROME_BINARY_PATH = get_chrome_binary()
@@ -3,14 +3,7 @@ import pandas as pd
 import glob
 from pathlib import Path
 from typing import Optional
-
-def normalize_player_names(name: str) -> str:
-    """
-    A simple function to standardize player names.
-    Can be expanded with more complex rules later.
-    """
-    # Example rule: FBREF sometimes uses backslashes for special characters
-    return name.split('\\')[0].strip()
+from data_pipelines._fbref_tables import read_stats_csv
 
 
 def find_player_column(df: pd.DataFrame) -> Optional[str]:
@@ -33,17 +26,21 @@ def clean_column_headers(df: pd.DataFrame) -> pd.DataFrame:
 
 def merge_dataframes(dfs: list[pd.DataFrame], key: str) -> pd.DataFrame:
     """
-    Merges a list of DataFrames on the given key using outer join.
+    Outer-joins a list of DataFrames on the given key in a single concat.
     Drops duplicate columns from subsequent DataFrames except the key.
     """
     if not dfs:
         return pd.DataFrame()
-    merged = dfs[0]
-    for df in dfs[1:]:
-        cols_to_drop = [col for col in df.columns if col in merged.columns and col != key]
-        df = df.drop(columns=cols_to_drop, errors='ignore')
-        merged = pd.merge(merged, df, on=key, how='outer')
-    return merged
+    seen = {key}
+    indexed = []
+    for df in dfs:
+        keep = [col for col in df.columns if col not in seen]
+        seen.update(keep)
+        # Number repeated keys so concat can align them like the pairwise merges did
+        occurrence = df.groupby(key, dropna=False, observed=True).cumcount().rename('_occurrence')
+        indexed.append(df.set_index([key, occurrence])[keep])
+    merged = pd.concat(indexed, axis=1, join='outer')
+    return merged.reset_index(level='_occurrence', drop=True).reset_index()
 
 
 def process_season_data(season_dir: str) -> pd.DataFrame:
@@ -55,37 +52,42 @@ def process_season_data(season_dir: str) -> pd.DataFrame:
         print(f"Season directory {season_dir} does not exist or is not a directory")
         return pd.DataFrame()
 
-    csv_files = list(season_path.glob('*.csv'))
+    # Scrapers write Parquet; fall back to CSV for seasons scraped before the switch
+    csv_files = sorted(season_path.glob('*.parquet'))
+    read_table = pd.read_parquet
+    if not csv_files:
+        csv_files = list(season_path.glob('*.csv'))
+        read_table = read_stats_csv
     if not csv_files:
-        print(f"No CSV files found in {season_dir}")
+        print(f"No Parquet or CSV files found in {season_dir}")
         return pd.DataFrame()
 
-    # Read the first file to determine the player column
-    try:
-        first_df = pd.read_csv(csv_files[0])
-    except Exception as e:
-        print(f"Could not read {csv_files[0]}. Error: {e}. Aborting season processing.")
-        return pd.DataFrame()
+    # Read every file exactly once, keeping the parsed frames for the merge below
+    frames = {}
+    for file_path in csv_files:
+        try:
+            frames[file_path] = read_table(file_path)
+        except Exception as e:
+            if file_path == csv_files[0]:
+                print(f"Could not read {file_path}. Error: {e}. Aborting season processing.")
+                return pd.DataFrame()
+            print(f"Could not read {file_path}. Error: {e}. Skipping.")
 
-    player_col = find_player_column(first_df)
+    # Use the first file to determine the player column
+    player_col = find_player_column(frames[csv_files[0]])
     if not player_col:
         print(f"Could not determine a player column in {csv_files[0]}. Aborting season processing.")
         return pd.DataFrame()
 
     # Collect valid DataFrames
     dfs = []
-    for file_path in csv_files:
-        try:
-            df = pd.read_csv(file_path)
-        except Exception as e:
-            print(f"Could not read {file_path}. Error: {e}. Skipping.")
-            continue
-
+    for file_path, df in frames.items():
         if player_col not in df.columns:
             print(f"Warning: Player column '{player_col}' not found in {file_path}. Skipping this file for merge.")
             continue
 
-        df[player_col] = df[player_col].apply(normalize_player_names)
+        # FBREF sometimes uses backslashes for special characters; keep the name before the first one
+        df[player_col] = df[player_col].str.split('\\', n=1).str[0].str.strip()
         dfs.append(df)
 
     if not dfs:
@@ -105,19 +107,26 @@ def main():
     # --- Configuration ---
     RAW_DATA_DIR = "raw_data"
     PROCESSED_DATA_DIR = "processed_data"
-    OUTPUT_FILE = "master_player_stats_v2.csv" # New output file name for the cleaned version
+    OUTPUT_FILE = "master_player_stats_v2.parquet" # Read by the next pipeline stage
+    OUTPUT_CSV_FILE = "master_player_stats_v2.csv" # Human-readable copy
 
     # --- Execution ---
     os.makedirs(PROCESSED_DATA_DIR, exist_ok=True)
     
     all_seasons_dfs = []
-    season_dirs = [d for d in os.listdir(RAW_DATA_DIR) if os.path.isdir(os.path.join(RAW_DATA_DIR, d))]
+    with os.scandir(RAW_DATA_DIR) as entries:
+        season_dirs = [entry.name for entry in entries if entry.is_dir()]
 
     for season_name in season_dirs:
         print(f"\n--- Processing Season: {season_name} ---")
         season_dir_path = os.path.join(RAW_DATA_DIR, season_name)
         season_df = process_season_data(season_dir_path)
         if season_df is not None and not season_df.empty:
+            # Drop duplicate columns that might arise from cleaning (e.g., 'Matches'),
+            # per season so concat can align them and the master frame isn't copied again
+            duplicated = season_df.columns.duplicated()
+            if duplicated.any():
+                season_df = season_df.loc[:, ~duplicated]
             season_df['Season'] = season_name # Add a column to identify the season
             all_seasons_dfs.append(season_df)
             print(f"Successfully processed {len(season_df.columns)} columns for {len(season_df)} players.")
@@ -126,11 +135,10 @@ def main():
         master_df = pd.concat(all_seasons_dfs, ignore_index=True)
         # Drop columns that are entirely empty, which can happen with bad merges
         master_df.dropna(axis=1, how='all', inplace=True)
-        # Drop duplicate columns that might arise from cleaning (e.g., 'Matches')
-        master_df = master_df.loc[:,~master_df.columns.duplicated()]
         
         output_path = os.path.join(PROCESSED_DATA_DIR, OUTPUT_FILE)
-        master_df.to_csv(output_path, index=False)
+        master_df.to_parquet(output_path, engine='pyarrow', compression='zstd', index=False)
+        master_df.to_csv(os.path.join(PROCESSED_DATA_DIR, OUTPUT_CSV_FILE), index=False)
         print(f"\n--- Processing Complete ---")
         print(f"Master dataset created with {len(master_df)} total player entries.")
         print(f"File saved to: {output_path}")
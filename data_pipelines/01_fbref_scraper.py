@@ -1,72 +1,30 @@
 import pandas as pd
-from bs4 import BeautifulSoup
-from selenium import webdriver
-from selenium.webdriver.chrome.service import Service as ChromeService
-from selenium.webdriver.chrome.options import Options
-from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
-from webdriver_manager.chrome import ChromeDriverManager
+import lxml.html
 import os
-import time
+import re
 import logging
-from io import StringIO
-
-def get_html_with_selenium(url: str, retries=3, delay=5) -> str | None:
-    """Fetches HTML content using Selenium with stealth options and retries."""
-    options = Options()
-    chrome_binary = os.environ.get('CHROME_BINARY')
-    if chrome_binary:
-        options.binary_location = chrome_binary
-    options.add_argument("--headless")
-    options.add_argument("--no-sandbox")
-    options.add_argument("--disable-dev-shm-usage")
-    options.add_argument("user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/94.0.4606.81 Safari/537.36")
-    options.add_argument('--disable-blink-features=AutomationControlled')
-    options.add_experimental_option("excludeSwitches", ["enable-automation"])
-    options.add_experimental_option('useAutomationExtension', False)
-
-    for attempt in range(retries):
-        driver = None
-        try:
-            service = ChromeService(ChromeDriverManager().install())
-            driver = webdriver.Chrome(service=service, options=options)
-            driver.execute_script("Object.defineProperty(navigator, 'webdriver', {get: () => undefined})")
-            driver.get(url)
-            WebDriverWait(driver, 20).until(EC.presence_of_element_located((By.CSS_SELECTOR, "table.stats_table")))
-            time.sleep(2)
-            return driver.page_source
-        except Exception as e:
-            logging.warning(f"Attempt {attempt + 1} failed for {url}: {e}")
-            if attempt < retries - 1:
-                time.sleep(delay)
-            else:
-                logging.error(f"All {retries} attempts failed for {url}.")
-                return None
-        finally:
-            if driver:
-                driver.quit()
+from _fbref_tables import MAX_TABLE_BYTES, table_to_dataframe
+from _http_utils import create_http_client, fetch_static
 
 def parse_and_save_table(html_content: str, table_id: str, output_path: str):
-    """Parses a specific table from HTML and saves it to a CSV."""
-    soup = BeautifulSoup(html_content, 'html.parser')
-    
-    # First, try finding the table directly by its ID
-    table = soup.find('table', {'id': table_id})
-    
-    # If not found, search within comments (a common FBREF practice)
-    if not table:
-        from bs4 import Comment
-        comments = soup.find_all(string=lambda text: isinstance(text, Comment))
-        for comment in comments:
-            comment_soup = BeautifulSoup(comment, 'html.parser')
-            if comment_soup.find('table', {'id': table_id}):
-                table = comment_soup.find('table', {'id': table_id})
-                break
-    
-    if table:
-        df = pd.read_html(StringIO(str(table)))[0]
-        df.to_csv(output_path, index=False)
+    """Parses a specific table from HTML and saves it to a Parquet file."""
+    # Slice the table's markup straight out of the raw page instead of parsing the whole
+    # document. Regex matching also sees through the HTML comments FBREF hides tables in.
+    match = re.search(rf'<table\b[^>]*\bid="{re.escape(table_id)}".*?</table>', html_content, re.DOTALL)
+    if match and len(match.group(0)) > MAX_TABLE_BYTES:
+        logging.warning(f"Table {table_id} is {len(match.group(0))} bytes, over the {MAX_TABLE_BYTES} limit. Skipping.")
+        return
+    table = lxml.html.fromstring(match.group(0)) if match else None
+
+    if table is not None:
+        df = table_to_dataframe(table)
+        # Parquet needs flat, unique column names: keep the real names from the last header row
+        # (FBREF's over-headers are dropped) and suffix repeated ones (e.g. per-90 'Gls') as 'Gls.1'
+        if isinstance(df.columns, pd.MultiIndex):
+            df.columns = df.columns.get_level_values(-1)
+        repeats = df.columns.to_series().groupby(level=0).cumcount()
+        df.columns = [f"{col}.{n}" if n else col for col, n in zip(df.columns, repeats)]
+        df.to_parquet(output_path, engine='pyarrow', compression='zstd', index=False)
         logging.info(f"Successfully parsed and saved table to {output_path}")
     else:
         logging.warning(f"Could not find table with ID: {table_id}")
@@ -90,11 +48,12 @@ def main():
     os.makedirs(OUTPUT_DIR, exist_ok=True)
 
     logging.info(f"--- Scraping Player Data for Season: {SEASON} ---")
-    html = get_html_with_selenium(SEASON_URL)
+    with create_http_client() as client:
+        html, _ = fetch_static(client, SEASON_URL)
     
     if html:
         for table_id, filename_prefix in TABLES_TO_SCRAPE.items():
-            output_file = f"{filename_prefix}_{SEASON}.csv"
+            output_file = f"{filename_prefix}_{SEASON}.parquet"
             output_path = os.path.join(OUTPUT_DIR, output_file)
             parse_and_save_table(html, table_id, output_path)
     else:
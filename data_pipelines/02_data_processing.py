@@ -1,6 +1,7 @@
 import pandas as pd
 import os
 import logging
+from _fbref_tables import read_stats_csv
 
 def find_player_column(df):
     """Dynamically finds the player column in a dataframe."""
@@ -15,37 +16,51 @@ def find_player_column(df):
 
 def process_season_data(season_path, season_name):
     """Loads, merges, and cleans all stat files for a single season using a composite key."""
-    all_files = [f for f in os.listdir(season_path) if f.endswith('.csv')]
+    # Scrapers write Parquet; fall back to CSV for seasons scraped before the switch
+    with os.scandir(season_path) as entries:
+        entries = [entry for entry in entries if entry.is_file()]
+    all_files = [entry for entry in entries if entry.name.endswith('.parquet')]
+    read_table = pd.read_parquet
     if not all_files:
-        logging.warning(f"No CSV files found in {season_path}. Skipping.")
+        all_files = [entry for entry in entries if entry.name.endswith('.csv')]
+        read_table = read_stats_csv
+    if not all_files:
+        logging.warning(f"No Parquet or CSV files found in {season_path}. Skipping.")
         return None
 
     # --- COMPOSITE KEY UPGRADE ---
     # These columns are present in all tables and form a reliable unique ID
     merge_keys = ['Player', 'Nation', 'Pos', 'Squad', 'Age']
     
-    merged_df = None
+    frames = []
+    # Columns already supplied by an earlier table; seeded with the keys so one hash lookup covers both
+    seen = set(merge_keys)
 
-    for i, filename in enumerate(all_files):
-        filepath = os.path.join(season_path, filename)
+    for entry in all_files:
+        filename, filepath = entry.name, entry.path
         try:
-            df = pd.read_csv(filepath)
+            df = read_table(filepath)
             
             # Basic validation to ensure the file has the necessary columns
             if not all(key in df.columns for key in merge_keys):
                 logging.warning(f"File {filename} is missing one of the merge keys. Skipping.")
                 continue
 
-            if i == 0:
-                merged_df = df
-            else:
-                # Drop duplicate informational columns from the right-side table before merging
-                cols_to_drop = [col for col in df.columns if col in merged_df.columns and col not in merge_keys]
-                df = df.drop(columns=cols_to_drop)
-                merged_df = pd.merge(merged_df, df, on=merge_keys, how='outer')
+            # Drop duplicate informational columns already provided by an earlier table
+            keep = [col for col in df.columns if col not in seen]
+            seen.update(keep)
+            # Number repeated keys so concat can align them like pairwise merges did
+            occurrence = df.groupby(merge_keys, dropna=False, observed=True).cumcount().rename('_occurrence')
+            frames.append(df.set_index([*merge_keys, occurrence])[keep])
         except Exception as e:
             logging.error(f"Failed to process file {filepath}: {e}")
             continue
+
+    # Outer-join every table in one pass instead of K-1 pairwise merges
+    merged_df = None
+    if frames:
+        merged_df = pd.concat(frames, axis=1, join='outer')
+        merged_df = merged_df.reset_index(level='_occurrence', drop=True).reset_index()
     
     if merged_df is not None:
         merged_df['Season'] = season_name
@@ -59,7 +74,8 @@ def main():
 
     INPUT_DIR = "raw_data"
     OUTPUT_DIR = "processed_data"
-    OUTPUT_FILE = "master_player_stats_v2.csv"
+    OUTPUT_FILE = "master_player_stats_v2.parquet" # Read by the next pipeline stage
+    OUTPUT_CSV_FILE = "master_player_stats_v2.csv" # Human-readable copy
     
     SEASONS_TO_PROCESS = ["2023-2024", "2024-2025", "2025-2026"]
     
@@ -84,13 +100,14 @@ def main():
     master_df = pd.concat(all_seasons_dfs, ignore_index=True)
     
     # Drop any fully empty columns that might be created during merges
-    master_df = master_df.dropna(axis=1, how='all')
+    master_df.dropna(axis=1, how='all', inplace=True)
     
     os.makedirs(OUTPUT_DIR, exist_ok=True)
     output_path = os.path.join(OUTPUT_DIR, OUTPUT_FILE)
     
     try:
-        master_df.to_csv(output_path, index=False)
+        master_df.to_parquet(output_path, engine='pyarrow', compression='zstd', index=False)
+        master_df.to_csv(os.path.join(OUTPUT_DIR, OUTPUT_CSV_FILE), index=False)
         logging.info("\n--- Processing Complete ---")
         logging.info(f"Master dataset created with {len(master_df)} total player entries.")
         logging.info(f"File saved to: {output_path}")
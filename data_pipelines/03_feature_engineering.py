@@ -62,8 +62,9 @@ def main():
     """Main execution function."""
     # --- Configuration ---
     PROCESSED_DATA_DIR = "processed_data"
-    INPUT_FILE = "master_player_stats_v2.csv"
-    OUTPUT_FILE = "master_player_stats_v3_features.csv"
+    INPUT_FILE = "master_player_stats_v2.parquet"
+    OUTPUT_FILE = "master_player_stats_v3_features.parquet"
+    OUTPUT_CSV_FILE = "master_player_stats_v3_features.csv" # Human-readable copy, also read by the v2/experiment stages
     
     input_path = os.path.join(PROCESSED_DATA_DIR, INPUT_FILE)
     output_path = os.path.join(PROCESSED_DATA_DIR, OUTPUT_FILE)
@@ -74,12 +75,13 @@ def main():
         return
 
     print(f"Reading cleaned data from {input_path}...")
-    master_df = pd.read_csv(input_path)
+    master_df = pd.read_parquet(input_path)
 
     print("Engineering new features...")
     featured_df = create_features(master_df)
 
-    featured_df.to_csv(output_path, index=False)
+    featured_df.to_parquet(output_path, engine='pyarrow', compression='zstd', index=False)
+    featured_df.to_csv(os.path.join(PROCESSED_DATA_DIR, OUTPUT_CSV_FILE), index=False)
     print(f"\n--- Feature Engineering Complete ---")
     print(f"Enriched dataset created with {len(featured_df.columns)} columns.")
     print(f"File saved to: {output_path}")
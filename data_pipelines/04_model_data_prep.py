@@ -1,48 +1,59 @@
 import pandas as pd
-from sklearn.model_selection import train_test_split
+import numpy as np
 import os
 
-def calculate_fantasy_points(row):
+# FPL points per goal by position
+GOAL_MULTIPLIER = {'FWD': 4, 'MID': 5, 'DEF': 6, 'GK': 6}
+
+def calculate_fantasy_points(df: pd.DataFrame) -> np.ndarray:
     """
     Calculates a proxy for FPL points based on available FBREF stats.
     This is a simplified model and can be expanded.
+    Operates on whole columns at once rather than row by row.
     """
-    points = 0
-    
-    # Points for playing
-    if row['Min'] > 0:
-        points += 1
-    if row['Min'] >= 60:
-        points += 1 # An additional point for 60+ minutes
-        
-    # Points for goals, varying by position
-    if row['Position'] == 'FWD':
-        points += row['Gls'] * 4
-    elif row['Position'] == 'MID':
-        points += row['Gls'] * 5
-    elif row['Position'] == 'DEF':
-        points += row['Gls'] * 6
-    else: # Goalkeepers
-        points += row['Gls'] * 6
+    minutes = df['Min'].to_numpy()
+
+    # Points for playing (an additional point for 60+ minutes), as one small int8 array
+    appearance = np.where(minutes >= 60, 2, np.where(minutes > 0, 1, 0)).astype(np.int8)
+
+    # Points for goals, varying by position. On a categorical Position the map runs once per
+    # category rather than per row; anything unlisted scores like a defender.
+    goal_multiplier = df['Position'].map(GOAL_MULTIPLIER).fillna(6).to_numpy(dtype=np.int8)
+    # The goals term is a fresh array, so the remaining terms accumulate into it in place
+    points = df['Gls'].to_numpy(dtype=np.float64) * goal_multiplier
+    points += appearance
 
     # Points for assists
-    points += row['Ast'] * 3
-    
+    points += df['Ast'].to_numpy() * 3
+
     # Negative points for cards
-    points -= row['CrdY'] * 1
-    points -= row['CrdR'] * 3
-    
+    points -= df['CrdY'].to_numpy()
+    points -= df['CrdR'].to_numpy() * 3
+
     # Note: Clean sheets, bonus points, saves, etc., are not included
     # as they are not directly available in this FBREF dataset.
-    
+
     return points
 
-def main():
-    """Main execution function for preparing data for modeling."""
+def densify_sparse_columns(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Converts the sparse one-hot dummy columns back to dense int8.
+    Row selection (as in the train/test split) upcasts sparse uint8 to Sparse[int64], so the
+    subtype isn't reused; 0/1 indicators always fit in int8.
+    """
+    sparse_dtypes = {col: np.int8 for col, dtype in df.dtypes.items() if isinstance(dtype, pd.SparseDtype)}
+    return df.astype(sparse_dtypes) if sparse_dtypes else df
+
+def main(save: bool = True):
+    """
+    Main execution function for preparing data for modeling.
+    Returns (X_train, y_train, X_test, y_test) so a caller in the same process can train on them
+    directly; with save=False nothing is written to model_data/.
+    """
     
     # --- Configuration ---
     PROCESSED_DATA_DIR = "processed_data"
-    INPUT_FILE = "master_player_stats_v3_features.csv"
+    INPUT_FILE = "master_player_stats_v3_features.parquet"
     
     input_path = os.path.join(PROCESSED_DATA_DIR, INPUT_FILE)
 
@@ -51,14 +62,16 @@ def main():
         print(f"Error: Input file not found at {input_path}")
         return
     print(f"Reading feature-engineered data from {input_path}...")
-    df = pd.read_csv(input_path)
+    df = pd.read_parquet(input_path)
     
     # --- 1. Define the Target Variable ---
     # Drop players with very few minutes as they add noise
     df = df[df['Min'] > 90].copy()
+    # A handful of distinct positions: categorical keeps lookups and one-hot encoding cheap
+    df['Position'] = df['Position'].astype('category')
     print(f"Filtered down to {len(df)} players with more than 90 minutes played.")
     
-    df['FantasyPoints'] = df.apply(calculate_fantasy_points, axis=1)
+    df['FantasyPoints'] = calculate_fantasy_points(df)
     print("Calculated 'FantasyPoints' target variable.")
 
     # --- 2. Feature Selection ---
@@ -83,30 +96,46 @@ def main():
     
     # --- 3. One-Hot Encoding for Categorical Data ---
     categorical_features = ['Squad', 'Position']
-    model_df = pd.get_dummies(model_df, columns=categorical_features, drop_first=True)
+    # Store numeric features as float32 up front; Parquet keeps the dtype all the way into training
+    numeric_features = [f for f in existing_features if f not in categorical_features]
+    model_df[numeric_features] = model_df[numeric_features].astype('float32')
+    # Sparse uint8 dummies: each row sets at most one of the ~20 squad / 4 position columns
+    model_df = pd.get_dummies(model_df, columns=categorical_features, drop_first=True, sparse=True, dtype=np.uint8)
     print("Applied one-hot encoding to categorical features.")
 
     # --- 4. Train-Test Split ---
-    X = model_df.drop(target, axis=1)
-    y = model_df[target]
-    
-    X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
+    # Shuffle row positions once and slice features/target straight out of model_df,
+    # rather than dropping the target into a copy and letting train_test_split copy again
+    n_rows = len(model_df)
+    permutation = np.random.default_rng(42).permutation(n_rows)
+    cut = int(0.8 * n_rows)
+    train_idx, test_idx = permutation[:cut], permutation[cut:]
+    feature_positions = [i for i, col in enumerate(model_df.columns) if col != target]
+    target_position = model_df.columns.get_loc(target)
+
+    X_train, X_test = model_df.iloc[train_idx, feature_positions], model_df.iloc[test_idx, feature_positions]
+    y_train, y_test = model_df.iloc[train_idx, target_position], model_df.iloc[test_idx, target_position]
     print("Split data into 80% training and 20% testing sets.")
 
+    # Parquet has no sparse column type, so densify the one-hot columns just before writing
+    X_train = densify_sparse_columns(X_train)
+    X_test = densify_sparse_columns(X_test)
+
     # --- Save the results ---
-    # Create a directory for the model-ready data
-    MODEL_DATA_DIR = "model_data"
-    os.makedirs(MODEL_DATA_DIR, exist_ok=True)
-    
-    X_train.to_csv(os.path.join(MODEL_DATA_DIR, "X_train.csv"), index=False)
-    X_test.to_csv(os.path.join(MODEL_DATA_DIR, "X_test.csv"), index=False)
-    y_train.to_csv(os.path.join(MODEL_DATA_DIR, "y_train.csv"), index=False)
-    y_test.to_csv(os.path.join(MODEL_DATA_DIR, "y_test.csv"), index=False)
-    
     print(f"\n--- Model Preparation Complete ---")
-    print(f"Prepared data saved to the '{MODEL_DATA_DIR}' directory.")
+    if save:
+        # Create a directory for the model-ready data
+        MODEL_DATA_DIR = "model_data"
+        os.makedirs(MODEL_DATA_DIR, exist_ok=True)
+
+        X_train.to_parquet(os.path.join(MODEL_DATA_DIR, "X_train.parquet"), engine='pyarrow', compression='zstd', index=False)
+        X_test.to_parquet(os.path.join(MODEL_DATA_DIR, "X_test.parquet"), engine='pyarrow', compression='zstd', index=False)
+        y_train.to_frame().to_parquet(os.path.join(MODEL_DATA_DIR, "y_train.parquet"), engine='pyarrow', compression='zstd', index=False)
+        y_test.to_frame().to_parquet(os.path.join(MODEL_DATA_DIR, "y_test.parquet"), engine='pyarrow', compression='zstd', index=False)
+        print(f"Prepared data saved to the '{MODEL_DATA_DIR}' directory.")
     print(f"Training set has {len(X_train)} players.")
     print(f"Testing set has {len(X_test)} players.")
+    return X_train, y_train, X_test, y_test
 
 
 if __name__ == '__main__':
@@ -1,21 +1,25 @@
 import pandas as pd
-from sklearn.model_selection import train_test_split
+import numpy as np
 import os
 import logging
 
-def calculate_fantasy_points(row):
-    """Calculates a proxy for FPL points based on available FBREF stats."""
-    points = 0
-    if row['Min'] > 0: points += 1
-    if row['Min'] >= 60: points += 1
-        
-    if row['Position'] == 'FWD': points += row['Gls'] * 4
-    elif row['Position'] == 'MID': points += row['Gls'] * 5
-    elif row['Position'] == 'DEF' or row['Position'] == 'GK': points += row['Gls'] * 6
+# FPL points per goal by position
+GOAL_MULTIPLIER = {'FWD': 4, 'MID': 5, 'DEF': 6, 'GK': 6}
 
-    points += row['Ast'] * 3
-    points -= row['CrdY'] * 1
-    points -= row['CrdR'] * 3
+def calculate_fantasy_points(df: pd.DataFrame) -> np.ndarray:
+    """Calculates a proxy for FPL points based on available FBREF stats, over whole columns at once."""
+    minutes = df['Min'].to_numpy()
+    appearance = np.where(minutes >= 60, 2, np.where(minutes > 0, 1, 0)).astype(np.int8)
+
+    # On a categorical Position the map runs once per category rather than per row
+    goal_multiplier = df['Position'].map(GOAL_MULTIPLIER).fillna(0).to_numpy(dtype=np.int8)
+    # The goals term is a fresh array, so the remaining terms accumulate into it in place
+    points = df['Gls'].to_numpy(dtype=np.float64) * goal_multiplier
+    points += appearance
+
+    points += df['Ast'].to_numpy() * 3
+    points -= df['CrdY'].to_numpy()
+    points -= df['CrdR'].to_numpy() * 3
     return points
 
 def main():
@@ -24,7 +28,7 @@ def main():
 
     # --- Configuration ---
     PROCESSED_DATA_DIR = "processed_data"
-    INPUT_FILE = "master_player_stats_v3_features.csv" # Using the v3 features for this experiment
+    INPUT_FILE = "master_player_stats_v3_features.parquet" # Using the v3 features for this experiment
     MODEL_DATA_DIR = "model_data_experiment"
     
     input_path = os.path.join(PROCESSED_DATA_DIR, INPUT_FILE)
@@ -34,7 +38,7 @@ def main():
         logging.error(f"Error: Input file not found at {input_path}")
         return
     logging.info(f"Reading feature-engineered data from {input_path}...")
-    df = pd.read_csv(input_path)
+    df = pd.read_parquet(input_path)
     
     # --- ROBUST DATA TYPE CONVERSION ---
     # Define columns that must be numeric for our calculation
@@ -49,7 +53,9 @@ def main():
     
     # --- 1. Define the Target Variable ---
     df = df[df['Min'] > 90].copy()
-    df['FantasyPoints'] = df.apply(calculate_fantasy_points, axis=1)
+    # A handful of distinct positions: categorical keeps lookups and one-hot encoding cheap
+    df['Position'] = df['Position'].astype('category')
+    df['FantasyPoints'] = calculate_fantasy_points(df)
     logging.info("Calculated 'FantasyPoints' target variable.")
 
     # --- 2. Feature Selection ---
@@ -66,22 +72,32 @@ def main():
     
     # --- 3. One-Hot Encoding ---
     categorical_features = ['Squad', 'Position']
-    model_df = pd.get_dummies(model_df, columns=categorical_features, drop_first=True)
+    # Store compact dtypes up front; Parquet keeps them all the way into training
+    numeric_features = [f for f in existing_features if f not in categorical_features]
+    model_df[numeric_features] = model_df[numeric_features].astype('float32')
+    model_df = pd.get_dummies(model_df, columns=categorical_features, drop_first=True, dtype=np.int8)
     logging.info("Applied one-hot encoding.")
 
     # --- 4. Train-Test Split ---
-    X = model_df.drop(target, axis=1)
-    y = model_df[target]
-    
-    X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
+    # Shuffle row positions once and slice features/target straight out of model_df,
+    # rather than dropping the target into a copy and letting train_test_split copy again
+    n_rows = len(model_df)
+    permutation = np.random.default_rng(42).permutation(n_rows)
+    cut = int(0.8 * n_rows)
+    train_idx, test_idx = permutation[:cut], permutation[cut:]
+    feature_positions = [i for i, col in enumerate(model_df.columns) if col != target]
+    target_position = model_df.columns.get_loc(target)
+
+    X_train, X_test = model_df.iloc[train_idx, feature_positions], model_df.iloc[test_idx, feature_positions]
+    y_train, y_test = model_df.iloc[train_idx, target_position], model_df.iloc[test_idx, target_position]
     logging.info("Split data into training and testing sets.")
 
     # --- Save the results ---
     os.makedirs(MODEL_DATA_DIR, exist_ok=True)
-    X_train.to_csv(os.path.join(MODEL_DATA_DIR, "X_train.csv"), index=False)
-    X_test.to_csv(os.path.join(MODEL_DATA_DIR, "X_test.csv"), index=False)
-    y_train.to_csv(os.path.join(MODEL_DATA_DIR, "y_train.csv"), index=False)
-    y_test.to_csv(os.path.join(MODEL_DATA_DIR, "y_test.csv"), index=False)
+    X_train.to_parquet(os.path.join(MODEL_DATA_DIR, "X_train.parquet"), engine='pyarrow', compression='zstd', index=False)
+    X_test.to_parquet(os.path.join(MODEL_DATA_DIR, "X_test.parquet"), engine='pyarrow', compression='zstd', index=False)
+    y_train.to_frame().to_parquet(os.path.join(MODEL_DATA_DIR, "y_train.parquet"), engine='pyarrow', compression='zstd', index=False)
+    y_test.to_frame().to_parquet(os.path.join(MODEL_DATA_DIR, "y_test.parquet"), engine='pyarrow', compression='zstd', index=False)
     
     logging.info(f"\n--- Experiment Model Preparation Complete ---")
     logging.info(f"Prepared data saved to the '{MODEL_DATA_DIR}' directory.")
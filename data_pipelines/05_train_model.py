@@ -1,13 +1,14 @@
 import argparse
+import json
 import logging
 import os
 from pathlib import Path
-from typing import Tuple
+from typing import Optional, Tuple
 
 import joblib
 import numpy as np
 import pandas as pd
-from sklearn.ensemble import RandomForestRegressor
+from sklearn.ensemble import HistGradientBoostingRegressor
 from sklearn.metrics import mean_absolute_error
 
 
@@ -19,12 +20,13 @@ def setup_logging(log_level: str = "INFO") -> None:
     )
 
 
-def load_data(model_data_dir: Path) -> Tuple[pd.DataFrame, np.ndarray, pd.DataFrame, np.ndarray]:
+def load_data(model_data_dir: Path, data_format: str = "parquet") -> Tuple[pd.DataFrame, np.ndarray, pd.DataFrame, np.ndarray]:
     """
-    Load training and testing data from CSV files.
+    Load training and testing data from Parquet (or legacy CSV) files.
 
     Args:
-        model_data_dir: Directory containing the data files.s
+        model_data_dir: Directory containing the data files.
+        data_format: File format of the prepared data, "parquet" or "csv".
 
     Returns:
         Tuple of (X_train, y_train, X_test, y_test).
@@ -33,11 +35,12 @@ def load_data(model_data_dir: Path) -> Tuple[pd.DataFrame, np.ndarray, pd.DataFr
         FileNotFoundError: If any required data file is missing.
         ValueError: If data loading fails.
     """
+    read = pd.read_parquet if data_format == "parquet" else pd.read_csv
     try:
-        X_train = pd.read_csv(model_data_dir / "X_train.csv")
-        y_train = pd.read_csv(model_data_dir / "y_train.csv").values.ravel()
-        X_test = pd.read_csv(model_data_dir / "X_test.csv")
-        y_test = pd.read_csv(model_data_dir / "y_test.csv").values.ravel()
+        X_train = read(model_data_dir / f"X_train.{data_format}")
+        y_train = read(model_data_dir / f"y_train.{data_format}").values.ravel()
+        X_test = read(model_data_dir / f"X_test.{data_format}")
+        y_test = read(model_data_dir / f"y_test.{data_format}").values.ravel()
         return X_train, y_train, X_test, y_test
     except FileNotFoundError as e:
         logging.error(f"Data files not found in {model_data_dir}. Please run the model preparation script first.")
@@ -110,40 +113,45 @@ def validate_data(X_train: pd.DataFrame, y_train: np.ndarray, X_test: pd.DataFra
     return X_train, X_test
 
 
-def optimize_data_types(X_train: pd.DataFrame, X_test: pd.DataFrame) -> Tuple[pd.DataFrame, pd.DataFrame]:
+def optimize_data_types(X_train: pd.DataFrame, X_test: pd.DataFrame) -> Tuple[np.ndarray, np.ndarray, list]:
     """
-    Optimize data types for better performance.
+    Convert features to C-contiguous float32 arrays, the layout the model works on internally.
 
     Args:
         X_train: Training features.
         X_test: Testing features.
 
     Returns:
-        Tuple of optimized (X_train, X_test).
+        Tuple of (X_train, X_test) arrays and the feature column names, in array column order.
     """
-    # Convert to float32 for memory efficiency
-    X_train = X_train.astype('float32')
-    X_test = X_test.astype('float32')
-    return X_train, X_test
+    # Doing the conversion once here means fit/predict don't each make their own validated copy
+    feature_columns = X_train.columns.tolist()
+    X_train = np.ascontiguousarray(X_train.to_numpy(dtype=np.float32))
+    X_test = np.ascontiguousarray(X_test.to_numpy(dtype=np.float32))
+    return X_train, X_test, feature_columns
 
 
-def train_model(X_train: pd.DataFrame, y_train: np.ndarray, n_estimators: int = 100, random_state: int = 42) -> RandomForestRegressor:
+def train_model(X_train: np.ndarray, y_train: np.ndarray, max_iter: int = 300, random_state: int = 42) -> HistGradientBoostingRegressor:
     """
-    Train the Random Forest model.
+    Train the histogram-based gradient boosting model.
 
     Args:
         X_train: Training features.
         y_train: Training targets.
-        n_estimators: Number of trees in the forest.
+        max_iter: Maximum number of boosting iterations (trees).
         random_state: Random state for reproducibility.
 
     Returns:
         Trained model.
     """
-    model = RandomForestRegressor(
-        n_estimators=n_estimators,
+    # Features are binned once into at most 255 buckets, so each split scans histograms
+    # instead of sorted raw values; threads over all cores via OpenMP
+    model = HistGradientBoostingRegressor(
+        max_iter=max_iter,
+        learning_rate=0.05,
+        max_bins=255,
+        early_stopping=True,
         random_state=random_state,
-        n_jobs=-1  # Use all available cores
     )
     logging.info("Starting model training...")
     model.fit(X_train, y_train)
@@ -151,7 +159,7 @@ def train_model(X_train: pd.DataFrame, y_train: np.ndarray, n_estimators: int =
     return model
 
 
-def evaluate_model(model: RandomForestRegressor, X_test: pd.DataFrame, y_test: np.ndarray) -> float:
+def evaluate_model(model: HistGradientBoostingRegressor, X_test: np.ndarray, y_test: np.ndarray) -> float:
     """
     Evaluate the model on test data.
 
@@ -170,22 +178,31 @@ def evaluate_model(model: RandomForestRegressor, X_test: pd.DataFrame, y_test: n
     return mae
 
 
-def save_model(model: RandomForestRegressor, model_output_dir: Path, model_name: str) -> None:
+def save_model(model: HistGradientBoostingRegressor, model_output_dir: Path, model_name: str, feature_columns: list) -> None:
     """
-    Save the trained model to disk.
+    Save the trained model to disk, alongside a JSON list of its feature columns.
 
     Args:
         model: Trained model.
         model_output_dir: Directory to save the model.
         model_name: Name of the model file.
+        feature_columns: Training column order, used to align prediction inputs.
     """
     model_output_dir.mkdir(parents=True, exist_ok=True)
     model_path = model_output_dir / model_name
-    joblib.dump(model, model_path)
+    # lz4, the codec every model dump in the pipeline uses: cheap to write and to decompress on load.
+    # Compressed pickles can't be memory-mapped, so 06 loads it normally.
+    joblib.dump(model, model_path, compress=('lz4', 3))
     logging.info(f"Model saved to: {model_path}")
 
+    columns_path = model_output_dir / f"{Path(model_name).stem}_columns.json"
+    with open(columns_path, "w") as f:
+        json.dump(feature_columns, f)
+    logging.info(f"Feature columns saved to: {columns_path}")
+
 
-def main(model_data_dir: str, model_output_dir: str, model_name: str, n_estimators: int, log_level: str) -> None:
+def main(model_data_dir: str, model_output_dir: str, model_name: str, max_iter: int, log_level: str, data_format: str = "parquet",
+         data: Optional[Tuple[pd.DataFrame, pd.Series, pd.DataFrame, pd.Series]] = None) -> None:
     """
     Main function to orchestrate the model training pipeline.
 
@@ -193,8 +210,11 @@ def main(model_data_dir: str, model_output_dir: str, model_name: str, n_estimato
         model_data_dir: Directory containing prepared data.
         model_output_dir: Directory to save the trained model.
         model_name: Name of the model file.
-        n_estimators: Number of estimators for the model.
+        max_iter: Maximum number of boosting iterations for the model.
         log_level: Logging level.
+        data_format: File format of the prepared data, "parquet" or "csv".
+        data: Optional in-memory (X_train, y_train, X_test, y_test) from the preparation step;
+            when given, nothing is read from model_data_dir.
     """
     setup_logging(log_level)
 
@@ -202,20 +222,24 @@ def main(model_data_dir: str, model_output_dir: str, model_name: str, n_estimato
 
     try:
         # Load and validate data
-        X_train, y_train, X_test, y_test = load_data(Path(model_data_dir))
+        if data is None:
+            X_train, y_train, X_test, y_test = load_data(Path(model_data_dir), data_format)
+        else:
+            X_train, y_train, X_test, y_test = data
+            y_train, y_test = np.ravel(y_train), np.ravel(y_test)
         X_train, X_test = validate_data(X_train, y_train, X_test, y_test)
 
         # Optimize data types
-        X_train, X_test = optimize_data_types(X_train, X_test)
+        X_train, X_test, feature_columns = optimize_data_types(X_train, X_test)
 
         # Train model
-        model = train_model(X_train, y_train, n_estimators)
+        model = train_model(X_train, y_train, max_iter)
 
         # Evaluate model
         evaluate_model(model, X_test, y_test)
 
         # Save model
-        save_model(model, Path(model_output_dir), model_name)
+        save_model(model, Path(model_output_dir), model_name, feature_columns)
 
         logging.info("FPL Oracle model training pipeline completed successfully.")
 
@@ -229,8 +253,9 @@ if __name__ == "__main__":
     parser.add_argument("--model-data-dir", type=str, default="../model_data", help="Directory containing prepared data.")
     parser.add_argument("--model-output-dir", type=str, default="../trained_models", help="Directory to save the trained model.")
     parser.add_argument("--model-name", type=str, default="fpl_oracle_model.joblib", help="Name of the model file.")
-    parser.add_argument("--n-estimators", type=int, default=100, help="Number of estimators for Random Forest.")
+    parser.add_argument("--max-iter", type=int, default=300, help="Maximum number of boosting iterations.")
+    parser.add_argument("--data-format", type=str, default="parquet", choices=["parquet", "csv"], help="File format of the prepared data.")
     parser.add_argument("--log-level", type=str, default="INFO", choices=["DEBUG", "INFO", "WARNING", "ERROR"], help="Logging level.")
 
     args = parser.parse_args()
-    main(args.model_data_dir, args.model_output_dir, args.model_name, args.n_estimators, args.log_level)
\ No newline at end of file
+    main(args.model_data_dir, args.model_output_dir, args.model_name, args.max_iter, args.log_level, args.data_format)
\ No newline at end of file
@@ -1,5 +1,5 @@
 import pandas as pd
-from sklearn.ensemble import RandomForestRegressor
+from sklearn.ensemble import HistGradientBoostingRegressor
 from sklearn.metrics import mean_absolute_error
 import joblib
 import os
@@ -19,10 +19,10 @@ def main():
     # --- Load Prepared Data ---
     logging.info(f"--- Loading Experiment Data from {MODEL_DATA_DIR} ---")
     try:
-        X_train = pd.read_csv(os.path.join(MODEL_DATA_DIR, "X_train.csv"))
-        y_train = pd.read_csv(os.path.join(MODEL_DATA_DIR, "y_train.csv")).values.ravel()
-        X_test = pd.read_csv(os.path.join(MODEL_DATA_DIR, "X_test.csv"))
-        y_test = pd.read_csv(os.path.join(MODEL_DATA_DIR, "y_test.csv")).values.ravel()
+        X_train = pd.read_parquet(os.path.join(MODEL_DATA_DIR, "X_train.parquet"))
+        y_train = pd.read_parquet(os.path.join(MODEL_DATA_DIR, "y_train.parquet")).values.ravel()
+        X_test = pd.read_parquet(os.path.join(MODEL_DATA_DIR, "X_test.parquet"))
+        y_test = pd.read_parquet(os.path.join(MODEL_DATA_DIR, "y_test.parquet")).values.ravel()
     except FileNotFoundError as e:
         logging.error(f"Error: Data files not found in {MODEL_DATA_DIR}. Please run the experiment preparation script first.")
         return
@@ -31,9 +31,9 @@ def main():
 
     # --- Initialize and Train the Model ---
     logging.info("\n--- Training the Experiment Oracle ---")
-    model = RandomForestRegressor(n_estimators=100, random_state=42, n_jobs=-1)
+    model = HistGradientBoostingRegressor(max_iter=300, learning_rate=0.05, max_bins=255, early_stopping=True, random_state=42)
     
-    logging.info("Model: RandomForestRegressor")
+    logging.info("Model: HistGradientBoostingRegressor")
     logging.info("Training started...")
     model.fit(X_train, y_train)
     logging.info("Training complete.")
@@ -50,7 +50,8 @@ def main():
     logging.info("\n--- Saving the Experiment Model ---")
     os.makedirs(MODEL_OUTPUT_DIR, exist_ok=True)
     model_path = os.path.join(MODEL_OUTPUT_DIR, MODEL_NAME)
-    joblib.dump(model, model_path)
+    # Compressed with lz4 like the other model dumps; joblib.load decompresses it transparently
+    joblib.dump(model, model_path, compress=('lz4', 3))
     
     logging.info(f"Experiment model saved to: {model_path}")
     logging.info("\n--- FPL Experiment Oracle is Trained and Ready ---")
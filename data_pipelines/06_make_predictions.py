@@ -1,4 +1,7 @@
 import pandas as pd
+import numpy as np
+import json
+import pyarrow.parquet as pq
 import joblib
 import os
 from pathlib import Path
@@ -12,8 +15,9 @@ def main():
     repo_root = Path(__file__).resolve().parent.parent
     MODEL_DIR = repo_root / "trained_models"
     MODEL_NAME = "fpl_oracle_model.joblib"
-    LATEST_DATA_FILE = repo_root / "processed_data" / "master_player_stats_v3_features.csv"
-    TRAINING_DATA_COLUMNS_FILE = repo_root / "model_data" / "X_train.csv"  # To get the column structure
+    LATEST_DATA_FILE = repo_root / "processed_data" / "master_player_stats_v3_features.parquet"
+    FEATURE_COLUMNS_FILE = MODEL_DIR / f"{Path(MODEL_NAME).stem}_columns.json"  # Column structure saved at training time
+    TRAINING_DATA_COLUMNS_FILE = repo_root / "model_data" / "X_train.parquet"  # Fallback for models trained before that
     PREDICTIONS_OUTPUT_DIR = repo_root / "predictions"
     PREDICTIONS_FILE = PREDICTIONS_OUTPUT_DIR / "gameweek_predictions.csv"
 
@@ -25,6 +29,10 @@ def main():
         
     print(f"Loading trained Oracle from {model_path}...")
     model = joblib.load(model_path)
+    # Forest models predict their trees in parallel when asked to; HistGradientBoosting has no
+    # n_jobs and already threads over every core
+    if hasattr(model, 'n_jobs'):
+        model.n_jobs = -1
     print("Oracle loaded successfully.")
 
     # --- Load the Latest Player Data to Predict On ---
@@ -34,9 +42,12 @@ def main():
         return
         
     print(f"Loading latest player data from {latest_data_path}...")
-    latest_df = pd.read_csv(latest_data_path)
+    latest_df = pd.read_parquet(latest_data_path)
     # Filter for the most recent season available in the data
-    latest_season = latest_df['Season'].max()
+    # Only a handful of distinct seasons: as a categorical, the max is taken over the categories
+    # and the equality test compares small integer codes instead of one string per row
+    latest_df['Season'] = latest_df['Season'].astype('category')
+    latest_season = latest_df['Season'].cat.categories.max()
     predict_df = latest_df[latest_df['Season'] == latest_season].copy()
     print(f"Predicting for season: {latest_season}")
     
@@ -46,28 +57,30 @@ def main():
     # --- Prepare the Data for Prediction (Critical Step) ---
     print("Preparing data for prediction...")
     # 1. One-hot encode categorical features
-    predict_df_encoded = pd.get_dummies(predict_df, columns=['Squad', 'Position'], drop_first=True)
+    # int8 dummies, matching the dtype of the training one-hot columns
+    predict_df_encoded = pd.get_dummies(predict_df, columns=['Squad', 'Position'], drop_first=True, dtype=np.int8)
     
     # 2. Align columns with the training data
     # Load the training data columns to ensure the structure is identical
     try:
-        training_columns = pd.read_csv(TRAINING_DATA_COLUMNS_FILE).columns
+        if os.path.exists(FEATURE_COLUMNS_FILE):
+            with open(FEATURE_COLUMNS_FILE) as f:
+                training_columns = json.load(f)
+        else:
+            # Only the Parquet footer is read; the column names live in the file schema
+            training_columns = pq.read_schema(TRAINING_DATA_COLUMNS_FILE).names
     except FileNotFoundError:
         print(f"Error: Training column template file not found at {TRAINING_DATA_COLUMNS_FILE}")
         return
 
-    # Add any missing columns to the prediction set and fill with 0
-    for col in training_columns:
-        if col not in predict_df_encoded.columns:
-            predict_df_encoded[col] = 0
-            
-    # Ensure the order of columns is the same as the training data
-    predict_df_aligned = predict_df_encoded[training_columns]
+    # Select the training columns in training order, filling any that are missing with 0, in one step
+    predict_df_aligned = predict_df_encoded.reindex(columns=training_columns, fill_value=0)
     print("Data aligned with model's training format.")
 
     # --- Make Predictions ---
     print("\n--- Oracle is now predicting FPL points... ---")
-    predictions = model.predict(predict_df_aligned)
+    # The model is fit on a float32 array in training-column order, so predict on the same layout
+    predictions = model.predict(np.ascontiguousarray(predict_df_aligned.to_numpy(dtype=np.float32)))
     
     # --- Create the Final Intelligence Report ---
     player_info['Predicted_Points'] = predictions
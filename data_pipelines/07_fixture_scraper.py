@@ -1,42 +1,9 @@
 import pandas as pd
-from bs4 import BeautifulSoup
 import os
-import time
-from selenium import webdriver
-from selenium.webdriver.chrome.service import Service as ChromeService
-from selenium.webdriver.chrome.options import Options
-from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
-from webdriver_manager.chrome import ChromeDriverManager
-from io import StringIO
 import logging
-
-def get_html_with_selenium(url: str) -> str | None:
-    """
-    Fetches the full HTML content of a page using Selenium to handle JavaScript rendering.
-    """
-    options = Options()
-    options.binary_location = "C:\\Program Files\\Google\\Chrome\\Application\\chrome.exe"
-    options.add_argument("--headless")
-    options.add_argument("--no-sandbox")
-    options.add_argument("--disable-dev-shm-usage")
-    options.add_argument("user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36")
-
-    driver = None
-    try:
-        service = ChromeService(ChromeDriverManager().install())
-        driver = webdriver.Chrome(service=service, options=options)
-        driver.get(url)
-        WebDriverWait(driver, 20).until(EC.presence_of_element_located((By.CLASS_NAME, "stats_table")))
-        time.sleep(2)
-        return driver.page_source
-    except Exception as e:
-        logging.error(f"An error occurred during Selenium execution for URL {url}: {e}")
-        return None
-    finally:
-        if driver:
-            driver.quit()
+from _selenium_utils import SeleniumFetcher
+from _http_utils import create_http_client, fetch_static
+from _fbref_tables import find_stats_table, table_to_dataframe
 
 def main():
     """
@@ -54,50 +21,55 @@ def main():
     
     all_fixtures_dfs = []
 
-    for season, url in SEASONS_TO_SCRAPE.items():
-        logging.info(f"--- Scraping fixtures for season: {season} ---")
-        html_content = get_html_with_selenium(url)
+    # Pages are fetched over plain HTTP; the browser only launches if a page needs rendering
+    with create_http_client() as client, SeleniumFetcher() as fetcher:
+        for season, url in SEASONS_TO_SCRAPE.items():
+            logging.info(f"--- Scraping fixtures for season: {season} ---")
+            html_content, _ = fetch_static(client, url)
+            if not html_content or 'stats_table' not in html_content:
+                logging.info(f"Fixture table not in the static HTML for {season}. Falling back to Selenium.")
+                html_content = fetcher.fetch(url)
         
-        if not html_content:
-            logging.error(f"Failed to retrieve HTML for {season}. Skipping.")
-            continue
+            if not html_content:
+                logging.error(f"Failed to retrieve HTML for {season}. Skipping.")
+                continue
 
-        soup = BeautifulSoup(html_content, 'html.parser')
-        table = soup.find('table', {'class': 'stats_table'})
+            table = find_stats_table(html_content)
         
-        if not table:
-            logging.error(f"Could not find fixture table for {season}. Skipping.")
-            continue
+            if table is None:
+                logging.error(f"Could not find fixture table for {season}. Skipping.")
+                continue
             
-        df = pd.read_html(StringIO(str(table)))[0]
+            df = table_to_dataframe(table, flat=True)
         
-        # --- Enriched Data Extraction ---
-        required_cols = ['Wk', 'Date', 'Home', 'Score', 'Away', 'xG', 'xG.1']
-        df = df[required_cols]
-        df = df.rename(columns={'xG': 'Home_xG', 'xG.1': 'Away_xG'})
+            # --- Enriched Data Extraction ---
+            required_cols = ['Wk', 'Date', 'Home', 'Score', 'Away', 'xG', 'xG.1']
+            df = df[required_cols]
+            df = df.rename(columns={'xG': 'Home_xG', 'xG.1': 'Away_xG'})
         
-        # --- Advanced Cleaning ---
-        # Handle rows that are not matches (like mid-table headers)
-        df = df.dropna(subset=['Wk'])
-        df = df[pd.to_numeric(df['Wk'], errors='coerce').notna()]
-        df['Wk'] = df['Wk'].astype(int)
+            # --- Advanced Cleaning ---
+            # Handle rows that are not matches (like mid-table headers)
+            df = df.dropna(subset=['Wk'])
+            df = df[pd.to_numeric(df['Wk'], errors='coerce').notna()]
+            df['Wk'] = df['Wk'].astype(int)
 
-        # Split the score into Home and Away goals
-        score_split = df['Score'].str.split(r'[-–]', regex=True, expand=True)
-        df['Home_Goals'] = pd.to_numeric(score_split[0], errors='coerce')
-        df['Away_Goals'] = pd.to_numeric(score_split[1], errors='coerce')
+            # Pull Home and Away goals out of the score in one regex pass. FBref separates them
+            # with an en dash; a plain hyphen is accepted too. Unplayed games have no score.
+            goals = df['Score'].str.extract(r'(\d+)\s*[-–]\s*(\d+)')
+            df['Home_Goals'] = pd.to_numeric(goals[0], errors='coerce')
+            df['Away_Goals'] = pd.to_numeric(goals[1], errors='coerce')
         
-        # Convert xG to numeric, handling missing values for future games
-        df['Home_xG'] = pd.to_numeric(df['Home_xG'], errors='coerce')
-        df['Away_xG'] = pd.to_numeric(df['Away_xG'], errors='coerce')
+            # Convert xG to numeric, handling missing values for future games
+            df['Home_xG'] = pd.to_numeric(df['Home_xG'], errors='coerce')
+            df['Away_xG'] = pd.to_numeric(df['Away_xG'], errors='coerce')
 
-        # Add season identifier and reorder columns for readability
-        df['Season'] = season
-        final_cols = ['Season', 'Wk', 'Date', 'Home', 'Away', 'Home_Goals', 'Away_Goals', 'Home_xG', 'Away_xG']
-        df = df[final_cols]
+            # Add season identifier and reorder columns for readability
+            df['Season'] = season
+            final_cols = ['Season', 'Wk', 'Date', 'Home', 'Away', 'Home_Goals', 'Away_Goals', 'Home_xG', 'Away_xG']
+            df = df[final_cols]
         
-        all_fixtures_dfs.append(df)
-        logging.info(f"Successfully processed {len(df)} matches for {season}.")
+            all_fixtures_dfs.append(df)
+            logging.info(f"Successfully processed {len(df)} matches for {season}.")
         
     # --- Combine, Sort, and Save Master File ---
     if all_fixtures_dfs:
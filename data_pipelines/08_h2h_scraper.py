@@ -1,50 +1,79 @@
 import pandas as pd
-from bs4 import BeautifulSoup
 import os
 import time
-from selenium import webdriver
-from selenium.webdriver.chrome.service import Service as ChromeService
-from selenium.webdriver.chrome.options import Options
-from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
-from webdriver_manager.chrome import ChromeDriverManager
-from io import StringIO
+import httpx
 import logging
-import random
-
-def get_html_with_selenium(url: str) -> str | None:
-    """Fetches the full HTML content of a page using Selenium with maximum stealth options."""
-    options = Options()
-    options.binary_location = "C:\\Program Files\\Google\\Chrome\\Application\\chrome.exe"
-    
-    # --- MAXIMUM STEALTH PROTOCOL ---
-    options.add_argument("--headless")
-    options.add_argument("--no-sandbox")
-    options.add_argument("--disable-dev-shm-usage")
-    options.add_argument("--disable-gpu")
-    options.add_argument("--window-size=1920,1200")
-    options.add_argument("user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/94.0.4606.81 Safari/537.36")
-    
-    options.add_argument('--disable-blink-features=AutomationControlled')
-    options.add_experimental_option("excludeSwitches", ["enable-automation", "enable-logging"])
-    options.add_experimental_option('useAutomationExtension', False)
-
-    driver = None
+import queue
+from concurrent.futures import ThreadPoolExecutor
+from _selenium_utils import SeleniumFetcher
+from _fbref_tables import find_stats_table, match_log_to_dataframe
+from _http_utils import NotModified, RateLimiter, create_http_client, fetch_static, load_etag_cache, save_etag_cache
+
+def match_log_url(squad_id: str, season: str, url_name: str) -> str:
+    return f"https://fbref.com/en/squads/{squad_id}/{season}/matchlogs/all_comps/schedule/{url_name}-Scores-and-Fixtures-All-Competitions"
+
+def scrape_team_season(client: httpx.Client, fetchers: queue.Queue, limiter: RateLimiter, etags: dict, team_display_name: str,
+                       url: str, season: str, output_path: str, max_retries: int, retry_delay: float) -> None:
+    """
+    Scrapes and saves one team's match log for one season. The page is fetched over plain HTTP,
+    falling back to a browser checked out of the pool only if the table isn't in the static HTML.
+    A match log that's already on disk is re-fetched conditionally and left alone if unchanged.
+    Every request, static or through a browser, waits on the limiter shared by all workers.
+    """
     try:
-        service = ChromeService(ChromeDriverManager().install())
-        driver = webdriver.Chrome(service=service, options=options)
-        driver.execute_script("Object.defineProperty(navigator, 'webdriver', {get: () => undefined})")
-        driver.get(url)
-        WebDriverWait(driver, 20).until(EC.presence_of_element_located((By.CSS_SELECTOR, "table.stats_table")))
-        time.sleep(3)
-        return driver.page_source
+        logging.info(f"Scraping H2H data for: {team_display_name}, {season}")
+        validators = etags.get(url) if os.path.exists(output_path) else None
+        try:
+            html_content, new_validators = fetch_static(client, url, max_retries, validators=validators, limiter=limiter)
+        except NotModified:
+            logging.info(f"Match log for {team_display_name}, {season} is unchanged since the last run. Skipping.")
+            return
+
+        if not html_content or 'stats_table' not in html_content:
+            logging.info(f"Match log not in the static HTML for {team_display_name}, {season}. Falling back to Selenium.")
+            html_content, new_validators = None, {}
+            fetcher = fetchers.get()
+            try:
+                for attempt in range(max_retries):
+                    logging.info(f"Scraping H2H data with Selenium for: {team_display_name}, {season} (Attempt {attempt + 1}/{max_retries})")
+                    limiter.wait()
+                    html_content = fetcher.fetch(url)
+
+                    if html_content:
+                        break
+
+                    logging.warning(f"Failed to get HTML on attempt {attempt + 1}. Retrying in {retry_delay} seconds...")
+                    time.sleep(retry_delay)
+            finally:
+                fetchers.put(fetcher)
+
+        if not html_content:
+            logging.error(f"Failed to get HTML for {team_display_name}, {season} after {max_retries} attempts. Skipping.")
+            return
+
+        table = find_stats_table(html_content)
+
+        if table is None:
+            logging.warning(f"No match log table found for {team_display_name}, {season}. Skipping.")
+            return
+
+        df = match_log_to_dataframe(table)
+        df_cleaned = df.dropna(subset=['Date', 'Opponent']).copy()
+        df_cleaned = df_cleaned[df_cleaned['Date'] != 'Date']
+        # Store every column as text so all team files share one schema when read as a dataset;
+        # scores and dates are parsed downstream anyway
+        df_cleaned = df_cleaned.astype('string')
+
+        # Each task writes its own file, so workers share no output state
+        os.makedirs(os.path.dirname(output_path), exist_ok=True)
+        df_cleaned.to_parquet(output_path, engine='pyarrow', compression='zstd', index=False)
+        logging.info(f"Successfully saved raw H2H data to {output_path}")
+        # Only remembered once the page has parsed and saved, so a failed run never masks a change.
+        # Each task owns its URL's entry, so workers never write the same key.
+        if new_validators:
+            etags[url] = new_validators
     except Exception as e:
-        logging.error(f"Selenium error for URL {url}: {e}")
-        return None
-    finally:
-        if driver:
-            driver.quit()
+        logging.error(f"Failed to process H2H data for {team_display_name}, {season}: {e}")
 
 def main():
     """Scrapes all-competition match logs for all Premier League teams for specified seasons."""
@@ -68,56 +97,43 @@ def main():
     OUTPUT_DIR = "raw_data/h2h"
     MAX_RETRIES = 3
     RETRY_DELAY = 10
+    MAX_WORKERS = 4  # Team-season pages fetched at once; the shared limiter still caps the request rate
+    REQUESTS_PER_MINUTE = 10  # FBREF's published limit for automated requests, across all workers
+    ETAG_CACHE_FILE = "cache/h2h_etags.json"  # URL -> ETag / Last-Modified / body hash from earlier runs
     os.makedirs(OUTPUT_DIR, exist_ok=True)
+    etags = load_etag_cache(ETAG_CACHE_FILE)
 
+    tasks = []
     for team_display_name, (squad_id, url_name) in TEAMS_CONFIG.items():
         for season in SEASONS_TO_SCRAPE:
-            output_filename = f"{team_display_name.replace(' ', '_')}_{season}_h2h.csv"
-            output_path = os.path.join(OUTPUT_DIR, output_filename)
+            # Hive-style layout (season=.../team=.../) lets downstream read every file as one dataset
+            team_dir = f"team={team_display_name.replace(' ', '_')}"
+            output_path = os.path.join(OUTPUT_DIR, f"season={season}", team_dir, "h2h.parquet")
+            url = match_log_url(squad_id, season, url_name)
 
-            if os.path.exists(output_path):
+            # Saved pages with validators are checked for changes; ones without are kept as-is
+            if os.path.exists(output_path) and url not in etags:
                 logging.info(f"Data for {team_display_name}, {season} already exists. Skipping.")
                 continue
 
-            url = f"https://fbref.com/en/squads/{squad_id}/{season}/matchlogs/all_comps/schedule/{url_name}-Scores-and-Fixtures-All-Competitions"
-            
-            for attempt in range(MAX_RETRIES):
-                logging.info(f"Scraping H2H data for: {team_display_name}, {season} (Attempt {attempt + 1}/{MAX_RETRIES})")
-                html_content = get_html_with_selenium(url)
-                
-                if html_content:
-                    break 
-                
-                logging.warning(f"Failed to get HTML on attempt {attempt + 1}. Retrying in {RETRY_DELAY} seconds...")
-                time.sleep(RETRY_DELAY)
-            
-            if not html_content:
-                logging.error(f"Failed to get HTML for {team_display_name}, {season} after {MAX_RETRIES} attempts. Skipping.")
-                continue
+            tasks.append((team_display_name, url, season, output_path))
 
-            soup = BeautifulSoup(html_content, 'html.parser')
-            table = soup.find('table', {'class': 'stats_table'})
-            
-            if not table:
-                logging.warning(f"No match log table found for {team_display_name}, {season}. Skipping.")
-                continue
-                
-            df = pd.read_html(StringIO(str(table)))[0]
-            
-            df = df[['Date', 'Comp', 'Opponent', 'Result', 'GF', 'GA']]
-            df.columns = ['Date', 'Competition', 'Opponent', 'Result', 'Goals_For', 'Goals_Against']
-            df_cleaned = df.dropna(subset=['Date', 'Opponent']).copy()
-            df_cleaned = df_cleaned[df_cleaned['Date'] != 'Date']
-            
-            df_cleaned.to_csv(output_path, index=False)
-            logging.info(f"Successfully saved raw H2H data to {output_path}")
-            
-            human_delay = random.uniform(5, 10)
-            logging.info(f"Pausing for {human_delay:.2f} seconds...")
-            time.sleep(human_delay)
+    # One limiter paces every worker's requests together, instead of each sleeping on its own
+    limiter = RateLimiter(REQUESTS_PER_MINUTE / 60)
+    # Each worker checks a browser out of this pool, so at most MAX_WORKERS Chromes run at once.
+    # Browsers launch lazily, so none start unless a page needs the Selenium fallback.
+    fetchers = queue.Queue()
+    for _ in range(min(MAX_WORKERS, len(tasks))):
+        fetchers.put(SeleniumFetcher())
+    try:
+        with create_http_client() as client, ThreadPoolExecutor(max_workers=MAX_WORKERS) as pool:
+            list(pool.map(lambda task: scrape_team_season(client, fetchers, limiter, etags, *task, MAX_RETRIES, RETRY_DELAY), tasks))
+    finally:
+        while not fetchers.empty():
+            fetchers.get().close()
+        save_etag_cache(ETAG_CACHE_FILE, etags)
 
     logging.info("\n--- H2H Scraping Mission Complete ---")
 
 if __name__ == '__main__':
     main()
-
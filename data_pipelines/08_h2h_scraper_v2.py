@@ -1,52 +1,63 @@
 import pandas as pd
-from bs4 import BeautifulSoup
 import os
 import time
-from selenium import webdriver
-from selenium.webdriver.chrome.service import Service as ChromeService
-from selenium.webdriver.chrome.options import Options
-from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
-from webdriver_manager.chrome import ChromeDriverManager
-from io import StringIO
 import logging
 import random
+import queue
+from concurrent.futures import ThreadPoolExecutor
 from config import CHROME_BINARY_PATH
+from _selenium_utils import SeleniumFetcher
+from _fbref_tables import find_stats_table, match_log_to_dataframe
+
+def scrape_team_season(fetchers: queue.Queue, team_display_name: str, squad_id: str, url_name: str,
+                       season: str, output_path: str, max_retries: int, retry_delay: float) -> None:
+    """Scrapes and saves one team's match log for one season, using a browser checked out of the pool."""
+    # Using the correct URL structure you discovered
+    url = f"https://fbref.com/en/squads/{squad_id}/{season}/matchlogs/all_comps/schedule/{url_name}-Scores-and-Fixtures-All-Competitions"
 
-def get_html_with_selenium(url: str) -> str | None:
-    """Fetches the full HTML content of a page using Selenium with maximum stealth options."""
-    options = Options()
-    if CHROME_BINARY_PATH and os.path.exists(CHROME_BINARY_PATH):
-        options.binary_location = CHROME_BINARY_PATH
-    
-    # --- MAXIMUM STEALTH PROTOCOL ---
-    options.add_argument("--headless")
-    options.add_argument("--no-sandbox")
-    options.add_argument("--disable-dev-shm-usage")
-    options.add_argument("--disable-gpu")
-    options.add_argument("--window-size=1920,1200")
-    options.add_argument("user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/94.0.4606.81 Safari/537.36")
-    
-    options.add_argument('--disable-blink-features=AutomationControlled')
-    options.add_experimental_option("excludeSwitches", ["enable-automation", "enable-logging"])
-    options.add_experimental_option('useAutomationExtension', False)
-
-    driver = None
     try:
-        service = ChromeService(ChromeDriverManager().install())
-        driver = webdriver.Chrome(service=service, options=options)
-        driver.execute_script("Object.defineProperty(navigator, 'webdriver', {get: () => undefined})")
-        driver.get(url)
-        WebDriverWait(driver, 20).until(EC.presence_of_element_located((By.CSS_SELECTOR, "table.stats_table")))
-        time.sleep(3)
-        return driver.page_source
+        html_content = None
+        fetcher = fetchers.get()
+        try:
+            for attempt in range(max_retries):
+                logging.info(f"Scraping H2H data for: {team_display_name}, {season} (Attempt {attempt + 1}/{max_retries})")
+                html_content = fetcher.fetch(url)
+
+                if html_content:
+                    break
+
+                logging.warning(f"Failed to get HTML on attempt {attempt + 1}. Retrying in {retry_delay} seconds...")
+                time.sleep(retry_delay)
+        finally:
+            fetchers.put(fetcher)
+
+        if not html_content:
+            logging.error(f"Failed to get HTML for {team_display_name}, {season} after {max_retries} attempts. Skipping.")
+            return
+
+        table = find_stats_table(html_content)
+
+        if table is None:
+            logging.warning(f"No match log table found for {team_display_name}, {season}. Skipping.")
+            return
+
+        df = match_log_to_dataframe(table)
+        df_cleaned = df.dropna(subset=['Date', 'Opponent']).copy()
+        df_cleaned = df_cleaned[df_cleaned['Date'] != 'Date']
+        # Text columns, as 08_h2h_scraper writes them, so every team file shares one dataset schema
+        df_cleaned = df_cleaned.astype('string')
+
+        # Each task writes its own file, so workers share no output state
+        os.makedirs(os.path.dirname(output_path), exist_ok=True)
+        df_cleaned.to_parquet(output_path, engine='pyarrow', compression='zstd', index=False)
+        logging.info(f"Successfully saved raw H2H data to {output_path}")
+
+        # The pause only spaces out this worker's own requests
+        human_delay = random.uniform(5, 10)
+        logging.info(f"Pausing for {human_delay:.2f} seconds...")
+        time.sleep(human_delay)
     except Exception as e:
-        logging.error(f"Selenium error for URL {url}: {e}")
-        return None
-    finally:
-        if driver:
-            driver.quit()
+        logging.error(f"Failed to process H2H data for {team_display_name}, {season}: {e}")
 
 def main():
     """Scrapes all-competition match logs for the newly promoted teams for the 2024-2025 season."""
@@ -63,54 +74,34 @@ def main():
     OUTPUT_DIR = "raw_data/h2h"
     MAX_RETRIES = 3
     RETRY_DELAY = 10
+    MAX_WORKERS = 4  # Concurrent headless browsers; each costs a few hundred MB of RAM
     os.makedirs(OUTPUT_DIR, exist_ok=True)
 
+    tasks = []
     for team_display_name, (squad_id, url_name) in TEAMS_CONFIG.items():
         for season in SEASONS_TO_SCRAPE:
-            output_filename = f"{team_display_name.replace(' ', '_')}_{season}_h2h.csv"
-            output_path = os.path.join(OUTPUT_DIR, output_filename)
+            # Same Hive-style layout as 08_h2h_scraper (season=.../team=.../), read by 09 as one dataset
+            team_dir = f"team={team_display_name.replace(' ', '_')}"
+            output_path = os.path.join(OUTPUT_DIR, f"season={season}", team_dir, "h2h.parquet")
+            # A flat CSV from an earlier run of this script counts as scraped too
+            legacy_path = os.path.join(OUTPUT_DIR, f"{team_display_name.replace(' ', '_')}_{season}_h2h.csv")
 
-            if os.path.exists(output_path):
+            if os.path.exists(output_path) or os.path.exists(legacy_path):
                 logging.info(f"Data for {team_display_name}, {season} already exists. Skipping.")
                 continue
 
-            # Using the correct URL structure you discovered
-            url = f"https://fbref.com/en/squads/{squad_id}/{season}/matchlogs/all_comps/schedule/{url_name}-Scores-and-Fixtures-All-Competitions"
-            
-            for attempt in range(MAX_RETRIES):
-                logging.info(f"Scraping H2H data for: {team_display_name}, {season} (Attempt {attempt + 1}/{MAX_RETRIES})")
-                html_content = get_html_with_selenium(url)
-                
-                if html_content:
-                    break 
-                
-                logging.warning(f"Failed to get HTML on attempt {attempt + 1}. Retrying in {RETRY_DELAY} seconds...")
-                time.sleep(RETRY_DELAY)
-            
-            if not html_content:
-                logging.error(f"Failed to get HTML for {team_display_name}, {season} after {MAX_RETRIES} attempts. Skipping.")
-                continue
+            tasks.append((team_display_name, squad_id, url_name, season, output_path))
 
-            soup = BeautifulSoup(html_content, 'html.parser')
-            table = soup.find('table', {'class': 'stats_table'})
-            
-            if not table:
-                logging.warning(f"No match log table found for {team_display_name}, {season}. Skipping.")
-                continue
-                
-            df = pd.read_html(StringIO(str(table)))[0]
-            
-            df = df[['Date', 'Comp', 'Opponent', 'Result', 'GF', 'GA']]
-            df.columns = ['Date', 'Competition', 'Opponent', 'Result', 'Goals_For', 'Goals_Against']
-            df_cleaned = df.dropna(subset=['Date', 'Opponent']).copy()
-            df_cleaned = df_cleaned[df_cleaned['Date'] != 'Date']
-            
-            df_cleaned.to_csv(output_path, index=False)
-            logging.info(f"Successfully saved raw H2H data to {output_path}")
-            
-            human_delay = random.uniform(5, 10)
-            logging.info(f"Pausing for {human_delay:.2f} seconds...")
-            time.sleep(human_delay)
+    # Each worker checks a browser out of this pool, so at most MAX_WORKERS Chromes run at once
+    fetchers = queue.Queue()
+    for _ in range(min(MAX_WORKERS, len(tasks))):
+        fetchers.put(SeleniumFetcher(binary_location=CHROME_BINARY_PATH))
+    try:
+        with ThreadPoolExecutor(max_workers=MAX_WORKERS) as pool:
+            list(pool.map(lambda task: scrape_team_season(fetchers, *task, MAX_RETRIES, RETRY_DELAY), tasks))
+    finally:
+        while not fetchers.empty():
+            fetchers.get().close()
 
     logging.info("\n--- H2H Targeted Scraping Mission Complete ---")
 
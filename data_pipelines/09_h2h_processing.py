@@ -1,4 +1,6 @@
 import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
 import os
 import logging
 
@@ -12,7 +14,9 @@ def main():
     # --- Configuration ---
     INPUT_DIR = "raw_data/h2h"
     OUTPUT_DIR = "processed_data"
-    OUTPUT_FILE = "h2h_master.csv"
+    OUTPUT_FILE = "h2h_master.parquet" # Read by the next pipeline stage
+    OUTPUT_CSV_FILE = "h2h_master.csv" # Human-readable copy
+    H2H_COLUMNS = ['Date', 'Competition', 'Opponent', 'Result', 'Goals_For', 'Goals_Against']
 
     if not os.path.exists(INPUT_DIR):
         logging.error(f"Input directory not found: {INPUT_DIR}. Please run the H2H scraper first.")
@@ -21,12 +25,23 @@ def main():
     all_matches = []
     
     # --- 1. Read and Combine All Raw Files ---
+    # The scraper writes one Parquet file per team under season=.../team=... directories. pyarrow
+    # discovers and reads them all in one multi-threaded pass, turning the directory keys into columns.
+    partitioning = ds.partitioning(pa.schema([('season', pa.string()), ('team', pa.string())]), flavor='hive')
+    dataset = ds.dataset(INPUT_DIR, format='parquet', partitioning=partitioning, exclude_invalid_files=True)
+    # Flat CSVs from before the Parquet layout are still picked up
     raw_files = [f for f in os.listdir(INPUT_DIR) if f.endswith('.csv')]
-    if not raw_files:
+    if not dataset.files and not raw_files:
         logging.error(f"No raw H2H files found in {INPUT_DIR}.")
         return
 
-    logging.info(f"Found {len(raw_files)} raw H2H files to process.")
+    logging.info(f"Found {len(dataset.files) + len(raw_files)} raw H2H files to process.")
+
+    if dataset.files:
+        df = dataset.to_table().to_pandas()
+        df = df.rename(columns={'season': 'Season', 'team': 'Team'})
+        df['Team'] = df['Team'].str.replace('_', ' ')
+        all_matches.append(df)
 
     for filename in raw_files:
         try:
@@ -36,7 +51,9 @@ def main():
             team_name = ' '.join(parts[:-1])
             
             filepath = os.path.join(INPUT_DIR, filename)
-            df = pd.read_csv(filepath)
+            # Read the known columns as text, like the Parquet match logs, so the C parser skips type
+            # inference on every file; goals are converted once after the combine
+            df = pd.read_csv(filepath, usecols=H2H_COLUMNS, dtype='string', engine='c')
             
             # Add perspective team and season
             df['Team'] = team_name
@@ -57,16 +74,21 @@ def main():
     master_df = master_df[master_df['Date'] != 'Date'].copy()
     master_df = master_df.dropna(subset=['Date', 'Opponent']) # Drop any other invalid rows
     
+    # Goals arrive as text from the Parquet match logs and as numbers from legacy CSVs; one numeric
+    # type keeps the column writable to Parquet (non-numeric entries such as shootout scores become NaN)
+    master_df[['Goals_For', 'Goals_Against']] = master_df[['Goals_For', 'Goals_Against']].apply(pd.to_numeric, errors='coerce')
+
     # Standardize result (W, L, D)
     master_df['Result'] = master_df['Result'].str[0]
 
     # --- 3. De-duplicate Matches (Critical Step) ---
     # Create a unique, sorted key for each match to identify duplicates
     # e.g., Liverpool vs West Ham and West Ham vs Liverpool get the same key
-    master_df['match_key'] = master_df.apply(
-        lambda row: '_'.join(sorted([row['Team'], row['Opponent']])) + '_' + row['Date'], 
-        axis=1
-    )
+    # Built over whole columns: an elementwise string comparison orders each pair of teams
+    team, opponent = master_df['Team'], master_df['Opponent']
+    team_first = team <= opponent
+    first, second = team.where(team_first, opponent), opponent.where(team_first, team)
+    master_df['match_key'] = first + '_' + second + '_' + master_df['Date'].astype(str)
     
     # Keep only the first occurrence of each unique match
     original_rows = len(master_df)
@@ -81,7 +103,8 @@ def main():
     
     os.makedirs(OUTPUT_DIR, exist_ok=True)
     output_path = os.path.join(OUTPUT_DIR, OUTPUT_FILE)
-    final_df.to_csv(output_path, index=False)
+    final_df.to_parquet(output_path, engine='pyarrow', compression='zstd', index=False)
+    final_df.to_csv(os.path.join(OUTPUT_DIR, OUTPUT_CSV_FILE), index=False)
     
     logging.info("\n--- H2H Processing Complete ---")
     logging.info(f"Final master H2H file has {len(final_df)} unique matches.")
@@ -3,36 +3,87 @@ import os
 import logging
 import numpy as np
 
-def get_h2h_stats(home_team, away_team, date, h2h_df):
+def order_pair(a: pd.Series, b: pd.Series) -> tuple[np.ndarray, np.ndarray]:
     """
-    Calculates historical H2H stats for a given matchup before a specific date.
+    Returns a canonical 'first|second' key for each pair of team names (in name order, so both
+    orientations of a fixture share one key) and whether `a` is the first team of its pair.
     """
-    # Find all historical matches between the two teams before the match date
-    historical_matches = h2h_df[
-        (((h2h_df['Team'] == home_team) & (h2h_df['Opponent'] == away_team)) |
-         ((h2h_df['Team'] == away_team) & (h2h_df['Opponent'] == home_team))) &
-        (h2h_df['Date'] < date)
-    ].copy()
-
-    if historical_matches.empty:
-        return pd.Series([0, 0, 0], index=['h2h_matches_played', 'h2h_home_win_pct', 'h2h_avg_goals'])
-
-    # Determine home team wins
-    home_wins = historical_matches[
-        ((historical_matches['Team'] == home_team) & (historical_matches['Result'] == 'W')) |
-        ((historical_matches['Opponent'] == home_team) & (historical_matches['Result'] == 'L'))
-    ].shape[0]
-
-    # Calculate home team average goals
-    home_goals = historical_matches.apply(
-        lambda row: row['Goals_For'] if row['Team'] == home_team else row['Goals_Against'], 
-        axis=1
-    ).mean()
-
-    matches_played = len(historical_matches)
-    win_pct = home_wins / matches_played if matches_played > 0 else 0
-    
-    return pd.Series([matches_played, win_pct, home_goals], index=['h2h_matches_played', 'h2h_home_win_pct', 'h2h_avg_goals'])
+    a_first = (a <= b).to_numpy()
+    key = np.where(a_first, (a + '|' + b).to_numpy(), (b + '|' + a).to_numpy())
+    return key, a_first
+
+def compute_h2h_features(fixture_df: pd.DataFrame, h2h_df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Calculates historical H2H stats for every fixture from the matches between the two teams
+    before the fixture's date: the number of such matches, and for each side its win rate and
+    average goals scored.
+
+    Rather than filtering the whole H2H table once per fixture, the H2H rows are sorted by
+    (pair of teams, date) and cumulatively summed once; the matches before a fixture are then a
+    contiguous run found with searchsorted, and their totals are differences of cumulative sums.
+    """
+    h2h_df = h2h_df[h2h_df['Date'].notna()]
+    h2h_key, team_first = order_pair(h2h_df['Team'], h2h_df['Opponent'])
+    fixture_key, home_first = order_pair(fixture_df['Home'], fixture_df['Away'])
+
+    # Each H2H row's result and goals from the point of view of the first and second team of its pair
+    won = (h2h_df['Result'] == 'W').to_numpy()
+    lost = (h2h_df['Result'] == 'L').to_numpy()
+    goals_for = h2h_df['Goals_For'].to_numpy(dtype=np.float64)
+    goals_against = h2h_df['Goals_Against'].to_numpy(dtype=np.float64)
+    first_goals = np.where(team_first, goals_for, goals_against)
+    second_goals = np.where(team_first, goals_against, goals_for)
+    per_row = {
+        'first_wins': np.where(team_first, won, lost),
+        'second_wins': np.where(team_first, lost, won),
+        # Goal averages skip missing scores, so sum the known goals and count them separately
+        'first_goals': np.nan_to_num(first_goals),
+        'first_scored': ~np.isnan(first_goals),
+        'second_goals': np.nan_to_num(second_goals),
+        'second_scored': ~np.isnan(second_goals),
+    }
+
+    # A single sortable integer per (pair, date): pair codes and date ranks over both tables
+    pair_codes, _ = pd.factorize(np.concatenate([h2h_key, fixture_key]))
+    h2h_pair, fixture_pair = pair_codes[:len(h2h_key)], pair_codes[len(h2h_key):]
+    h2h_dates = h2h_df['Date'].to_numpy(dtype='datetime64[ns]')
+    fixture_dates = fixture_df['Date'].to_numpy(dtype='datetime64[ns]')
+    all_dates = np.unique(np.concatenate([h2h_dates, fixture_dates]))
+    n_dates = len(all_dates) + 1
+    h2h_composite = h2h_pair * n_dates + np.searchsorted(all_dates, h2h_dates)
+    order = np.argsort(h2h_composite, kind='stable')
+    h2h_composite = h2h_composite[order]
+
+    # First row of the fixture's pair, and first row of that pair on or after the fixture's date
+    block_start = np.searchsorted(h2h_composite, fixture_pair * n_dates, side='left')
+    before_date = np.searchsorted(h2h_composite, fixture_pair * n_dates + np.searchsorted(all_dates, fixture_dates), side='left')
+    # A fixture without a date has no earlier matches, as the row-wise comparison used to give
+    before_date = np.where(np.isnat(fixture_dates), block_start, before_date)
+
+    totals = {}
+    for name, values in per_row.items():
+        cumulative = np.concatenate([[0], np.cumsum(values[order], dtype=np.float64)])
+        totals[name] = cumulative[before_date] - cumulative[block_start]
+
+    matches_played = before_date - block_start
+    home_wins = np.where(home_first, totals['first_wins'], totals['second_wins'])
+    away_wins = np.where(home_first, totals['second_wins'], totals['first_wins'])
+    home_goals = np.where(home_first, totals['first_goals'], totals['second_goals'])
+    home_scored = np.where(home_first, totals['first_scored'], totals['second_scored'])
+    away_goals = np.where(home_first, totals['second_goals'], totals['first_goals'])
+    away_scored = np.where(home_first, totals['second_scored'], totals['first_scored'])
+
+    played = matches_played > 0
+    with np.errstate(divide='ignore', invalid='ignore'):
+        features = pd.DataFrame({
+            'h2h_matches_played': matches_played,
+            # No earlier meetings count as 0; meetings with no known scores leave the average missing
+            'h2h_home_win_pct_home': np.where(played, home_wins / matches_played, 0),
+            'h2h_avg_goals_home': np.where(played, home_goals / home_scored, 0),
+            'h2h_home_win_pct_away': np.where(played, away_wins / matches_played, 0),
+            'h2h_avg_goals_away': np.where(played, away_goals / away_scored, 0),
+        }, index=fixture_df.index)
+    return features
 
 def main():
     """
@@ -43,17 +94,18 @@ def main():
 
     # --- Configuration ---
     PROCESSED_DIR = "processed_data"
-    PLAYER_DATA_FILE = "master_player_stats_v2.csv"
+    PLAYER_DATA_FILE = "master_player_stats_v2.parquet"
     FIXTURE_DATA_FILE = "fixtures_master.csv"
-    H2H_DATA_FILE = "h2h_master.csv"
-    OUTPUT_FILE = "master_player_stats_v4_h2h_features.csv"
+    H2H_DATA_FILE = "h2h_master.parquet"
+    OUTPUT_FILE = "master_player_stats_v4_h2h_features.parquet" # Read by the next pipeline stage
+    OUTPUT_CSV_FILE = "master_player_stats_v4_h2h_features.csv" # Human-readable copy
 
     # --- Load Data ---
     logging.info("Loading all necessary datasets...")
     try:
-        player_df = pd.read_csv(os.path.join(PROCESSED_DIR, PLAYER_DATA_FILE))
+        player_df = pd.read_parquet(os.path.join(PROCESSED_DIR, PLAYER_DATA_FILE))
         fixture_df = pd.read_csv(os.path.join(PROCESSED_DIR, FIXTURE_DATA_FILE))
-        h2h_df = pd.read_csv(os.path.join(PROCESSED_DIR, H2H_DATA_FILE))
+        h2h_df = pd.read_parquet(os.path.join(PROCESSED_DIR, H2H_DATA_FILE))
     except FileNotFoundError as e:
         logging.error(f"Required data file not found: {e}. Please ensure all previous scripts have run.")
         return
@@ -69,19 +121,7 @@ def main():
     
     # --- 1. Engineer H2H Features for each Fixture ---
     logging.info("Engineering H2H features for each historical fixture...")
-    h2h_features = fixture_df.apply(
-        lambda row: pd.concat([
-            get_h2h_stats(row['Home'], row['Away'], row['Date'], h2h_df).rename({
-                'h2h_home_win_pct': 'h2h_home_win_pct_home',
-                'h2h_avg_goals': 'h2h_avg_goals_home'
-            }),
-            get_h2h_stats(row['Away'], row['Home'], row['Date'], h2h_df).rename({
-                'h2h_home_win_pct': 'h2h_home_win_pct_away',
-                'h2h_avg_goals': 'h2h_avg_goals_away'
-            })
-        ]),
-        axis=1
-    )
+    h2h_features = compute_h2h_features(fixture_df, h2h_df)
     fixture_df_h2h = pd.concat([fixture_df, h2h_features], axis=1)
     
     # --- 2. Merge H2H Context with Player Data ---
@@ -99,21 +139,34 @@ def main():
 
     # --- 3. Re-calculate Final Features ---
     logging.info("Re-calculating final predictive features...")
-    final_df['90s'] = final_df['Min'] / 90
+    # Each input column is pulled out once and the derived columns are assigned together,
+    # rather than re-reading final_df columns for every feature
+    minutes, xg, xag, gls, ast = (final_df[col].to_numpy(dtype=np.float64, na_value=np.nan) for col in ['Min', 'xG', 'xAG', 'Gls', 'Ast'])
+    nineties = minutes / 90
+    played = nineties > 0
+    safe_nineties = np.where(played, nineties, 1.0)
+    final_df = final_df.assign(**{
+        '90s': nineties,
+        'xG_p90': np.where(played, xg / safe_nineties, 0),
+        'xAG_p90': np.where(played, xag / safe_nineties, 0),
+        'Gls_minus_xG': gls - xg,
+        'Ast_minus_xAG': ast - xag,
+    })
     
-    final_df['xG_p90'] = np.where(final_df['90s'] > 0, final_df['xG'] / final_df['90s'], 0)
-    final_df['xAG_p90'] = np.where(final_df['90s'] > 0, final_df['xAG'] / final_df['90s'], 0)
-    
-    final_df['Gls_minus_xG'] = final_df['Gls'] - final_df['xG']
-    final_df['Ast_minus_xAG'] = final_df['Ast'] - final_df['xAG']
-    
-    final_df['Position'] = final_df['Pos'].apply(lambda x: 'FWD' if 'FW' in str(x) else ('MID' if 'MF' in str(x) else ('DEF' if 'DF' in str(x) else 'GK')))
+    # First matching code wins (e.g. 'MF,FW' is a forward); anything else, missing included, is a keeper
+    pos = final_df['Pos'].astype(str)
+    final_df['Position'] = np.select(
+        [pos.str.contains('FW', na=False), pos.str.contains('MF', na=False), pos.str.contains('DF', na=False)],
+        ['FWD', 'MID', 'DEF'],
+        default='GK',
+    )
     
     final_df.replace([np.inf, -np.inf], 0, inplace=True)
     
     # --- Save the Final Dataset ---
     output_path = os.path.join(PROCESSED_DIR, OUTPUT_FILE)
-    final_df.to_csv(output_path, index=False)
+    final_df.to_parquet(output_path, engine='pyarrow', compression='zstd', index=False)
+    final_df.to_csv(os.path.join(PROCESSED_DIR, OUTPUT_CSV_FILE), index=False)
     
     logging.info("\n--- H2H Feature Integration Complete ---")
     logging.info(f"Final dataset with {len(final_df.columns)} columns created.")
@@ -1,21 +1,26 @@
 import pandas as pd
+import numpy as np
 from sklearn.model_selection import train_test_split
 import os
 import logging
 
-def calculate_fantasy_points(row):
-    """Calculates a proxy for FPL points based on available FBREF stats."""
-    points = 0
-    if row['Min'] > 0: points += 1
-    if row['Min'] >= 60: points += 1
-        
-    if row['Position'] == 'FWD': points += row['Gls'] * 4
-    elif row['Position'] == 'MID': points += row['Gls'] * 5
-    elif row['Position'] == 'DEF' or row['Position'] == 'GK': points += row['Gls'] * 6
+# FPL points per goal by position
+GOAL_MULTIPLIER = {'FWD': 4, 'MID': 5, 'DEF': 6, 'GK': 6}
 
-    points += row['Ast'] * 3
-    points -= row['CrdY'] * 1
-    points -= row['CrdR'] * 3
+def calculate_fantasy_points(df: pd.DataFrame) -> np.ndarray:
+    """Calculates a proxy for FPL points based on available FBREF stats, over whole columns at once."""
+    minutes = df['Min'].to_numpy()
+    appearance = np.where(minutes >= 60, 2, np.where(minutes > 0, 1, 0)).astype(np.int8)
+
+    # On a categorical Position the map runs once per category rather than per row
+    goal_multiplier = df['Position'].map(GOAL_MULTIPLIER).fillna(0).to_numpy(dtype=np.int8)
+    # The goals term is a fresh array, so the remaining terms accumulate into it in place
+    points = df['Gls'].to_numpy(dtype=np.float64) * goal_multiplier
+    points += appearance
+
+    points += df['Ast'].to_numpy() * 3
+    points -= df['CrdY'].to_numpy()
+    points -= df['CrdR'].to_numpy() * 3
     return points
 
 def main():
@@ -25,7 +30,7 @@ def main():
     # --- Configuration ---
     PROCESSED_DATA_DIR = "processed_data"
     # --- CORRECTED FILENAME ---
-    INPUT_FILE = "master_player_stats_v4_h2h_features.csv" 
+    INPUT_FILE = "master_player_stats_v4_h2h_features.parquet" 
     MODEL_DATA_DIR = "model_data_v4"
     
     input_path = os.path.join(PROCESSED_DATA_DIR, INPUT_FILE)
@@ -35,11 +40,13 @@ def main():
         logging.error(f"Error: Input file not found at {input_path}")
         return
     logging.info(f"Reading final feature-engineered data from {input_path}...")
-    df = pd.read_csv(input_path)
+    df = pd.read_parquet(input_path)
     
     # --- 1. Define the Target Variable ---
     df = df[df['Min'] > 90].copy()
-    df['FantasyPoints'] = df.apply(calculate_fantasy_points, axis=1)
+    # A handful of distinct positions: categorical keeps lookups and one-hot encoding cheap
+    df['Position'] = df['Position'].astype('category')
+    df['FantasyPoints'] = calculate_fantasy_points(df)
     logging.info("Calculated 'FantasyPoints' target variable.")
 
     # --- 2. Feature Selection (Now including our new features) ---
@@ -59,10 +66,15 @@ def main():
     logging.info(f"Selected {len(existing_features)} features for the v4 model.")
     model_df = df[existing_features + [target]].copy()
     
-    # --- 3. One-Hot Encoding ---
+    # --- 3. Categorical Features ---
+    # Squad and Position stay as two categorical columns rather than ~20 one-hot columns: Parquet
+    # stores them dictionary-encoded and the v4 model splits on the categories directly
     categorical_features = ['Squad', 'Position']
-    model_df = pd.get_dummies(model_df, columns=categorical_features, drop_first=True)
-    logging.info("Applied one-hot encoding to categorical features.")
+    model_df[categorical_features] = model_df[categorical_features].astype('category')
+    # Store numeric features as float32 up front; Parquet keeps the dtype all the way into training
+    numeric_features = [f for f in existing_features if f not in categorical_features]
+    model_df[numeric_features] = model_df[numeric_features].astype('float32')
+    logging.info("Encoded Squad and Position as categorical features.")
 
     # --- 4. Train-Test Split ---
     X = model_df.drop(target, axis=1)
@@ -74,10 +86,10 @@ def main():
     # --- Save the results to a new directory ---
     os.makedirs(MODEL_DATA_DIR, exist_ok=True)
     
-    X_train.to_csv(os.path.join(MODEL_DATA_DIR, "X_train.csv"), index=False)
-    X_test.to_csv(os.path.join(MODEL_DATA_DIR, "X_test.csv"), index=False)
-    y_train.to_csv(os.path.join(MODEL_DATA_DIR, "y_train.csv"), index=False)
-    y_test.to_csv(os.path.join(MODEL_DATA_DIR, "y_test.csv"), index=False)
+    X_train.to_parquet(os.path.join(MODEL_DATA_DIR, "X_train.parquet"), engine='pyarrow', compression='zstd', index=False)
+    X_test.to_parquet(os.path.join(MODEL_DATA_DIR, "X_test.parquet"), engine='pyarrow', compression='zstd', index=False)
+    y_train.to_frame().to_parquet(os.path.join(MODEL_DATA_DIR, "y_train.parquet"), engine='pyarrow', compression='zstd', index=False)
+    y_test.to_frame().to_parquet(os.path.join(MODEL_DATA_DIR, "y_test.parquet"), engine='pyarrow', compression='zstd', index=False)
     
     logging.info(f"\n--- v4 Model Preparation Complete ---")
     logging.info(f"Prepared data saved to the '{MODEL_DATA_DIR}' directory.")
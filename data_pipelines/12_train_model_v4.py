@@ -1,5 +1,5 @@
 import pandas as pd
-from sklearn.ensemble import RandomForestRegressor
+from sklearn.ensemble import HistGradientBoostingRegressor
 from sklearn.metrics import mean_absolute_error
 import joblib
 import os
@@ -18,10 +18,10 @@ def main():
     # --- Load Prepared Data ---
     logging.info("--- Loading Prepared v4 Data ---")
     try:
-        X_train = pd.read_csv(os.path.join(MODEL_DATA_DIR, "X_train.csv"))
-        y_train = pd.read_csv(os.path.join(MODEL_DATA_DIR, "y_train.csv")).values.ravel()
-        X_test = pd.read_csv(os.path.join(MODEL_DATA_DIR, "X_test.csv"))
-        y_test = pd.read_csv(os.path.join(MODEL_DATA_DIR, "y_test.csv")).values.ravel()
+        X_train = pd.read_parquet(os.path.join(MODEL_DATA_DIR, "X_train.parquet"))
+        y_train = pd.read_parquet(os.path.join(MODEL_DATA_DIR, "y_train.parquet")).values.ravel()
+        X_test = pd.read_parquet(os.path.join(MODEL_DATA_DIR, "X_test.parquet"))
+        y_test = pd.read_parquet(os.path.join(MODEL_DATA_DIR, "y_test.parquet")).values.ravel()
     except FileNotFoundError as e:
         logging.error(f"Error: Data files not found in {MODEL_DATA_DIR}. Please run the v4 preparation script first.")
         sys.exit(1)
@@ -30,9 +30,13 @@ def main():
 
     # --- Initialize and Train the Model ---
     logging.info("\n--- Training the v4 Oracle ---")
-    model = RandomForestRegressor(n_estimators=100, random_state=42, n_jobs=-1)
+    # Squad and Position arrive as pandas categoricals, so the model handles them natively
+    model = HistGradientBoostingRegressor(
+        max_iter=500, learning_rate=0.05, max_depth=None, early_stopping=True,
+        categorical_features="from_dtype", random_state=42,
+    )
     
-    logging.info("Model: RandomForestRegressor")
+    logging.info("Model: HistGradientBoostingRegressor")
     logging.info("Training started...")
     model.fit(X_train, y_train)
     logging.info("Training complete.")
@@ -49,7 +53,8 @@ def main():
     logging.info("\n--- Saving the v4 Trained Model ---")
     os.makedirs(MODEL_OUTPUT_DIR, exist_ok=True)
     model_path = os.path.join(MODEL_OUTPUT_DIR, MODEL_NAME)
-    joblib.dump(model, model_path)
+    # lz4-compressed like the 05 models; 13 reads it back with a plain joblib.load
+    joblib.dump(model, model_path, compress=('lz4', 3), protocol=5)
     
     logging.info(f"v4 Model 'brain' saved to: {model_path}")
     logging.info("\n--- FPL Oracle v4.0 is Trained and Ready ---")
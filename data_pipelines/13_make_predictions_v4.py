@@ -1,4 +1,6 @@
 import pandas as pd
+import numpy as np
+import pyarrow.parquet as pq
 import joblib
 import os
 import logging
@@ -15,9 +17,10 @@ def main():
     MODEL_NAME = "fpl_oracle_model_experiment.joblib" 
     DATA_DIR = "processed_data"
     LATEST_DATA_FILE = "master_player_stats_v3_features.csv"
-    TRAINING_DATA_COLUMNS_FILE = "model_data_experiment/X_train.csv" # Align with the experiment data
+    TRAINING_DATA_COLUMNS_FILE = "model_data_experiment/X_train.parquet" # Align with the experiment data
     PREDICTIONS_OUTPUT_DIR = "predictions"
-    PREDICTIONS_FILE = "gameweek_predictions_experiment.csv"
+    PREDICTIONS_FILE = "gameweek_predictions_experiment.parquet"
+    PREDICTIONS_CSV_FILE = "gameweek_predictions_experiment.csv" # Human-readable copy
 
     # --- Load the Trained Model ---
     model_path = os.path.join(MODEL_DIR, MODEL_NAME)
@@ -27,6 +30,10 @@ def main():
         
     logging.info(f"Loading trained Oracle from {model_path}...")
     model = joblib.load(model_path)
+    # Forest models predict their trees in parallel when asked to; HistGradientBoosting has no
+    # n_jobs and already threads over every core
+    if hasattr(model, 'n_jobs'):
+        model.n_jobs = -1
     logging.info("Oracle loaded successfully.")
 
     # --- Load the Latest Player Data to Predict On ---
@@ -37,7 +44,10 @@ def main():
         
     logging.info(f"Loading latest player data from {latest_data_path}...")
     latest_df = pd.read_csv(latest_data_path)
-    latest_season = latest_df['Season'].max()
+    # Only a handful of distinct seasons: as a categorical, the max is taken over the categories
+    # and the equality test compares small integer codes instead of one string per row
+    latest_df['Season'] = latest_df['Season'].astype('category')
+    latest_season = latest_df['Season'].cat.categories.max()
     predict_df = latest_df[latest_df['Season'] == latest_season].copy()
     logging.info(f"Predicting for season: {latest_season}")
     
@@ -48,39 +58,35 @@ def main():
     predict_df_encoded = pd.get_dummies(predict_df, columns=['Squad', 'Position'], drop_first=True)
     
     try:
-        training_columns = pd.read_csv(TRAINING_DATA_COLUMNS_FILE).columns
+        # Only the Parquet footer is read; the column names live in the file schema
+        training_columns = pq.read_schema(TRAINING_DATA_COLUMNS_FILE).names
     except FileNotFoundError:
         logging.error(f"Error: Training column template not found at {TRAINING_DATA_COLUMNS_FILE}")
         return
 
-    # Add any missing one-hot encoded columns and fill with 0
-    for col in training_columns:
-        if col not in predict_df_encoded.columns:
-            predict_df_encoded[col] = 0
-            
-    # Ensure the order of columns is the same as the training data
-    predict_df_aligned = predict_df_encoded[training_columns]
+    # Put the columns in training order in one step; one-hot columns this season lacks are added as 0
+    predict_df_aligned = predict_df_encoded.reindex(columns=training_columns, fill_value=0)
     
     # --- PRE-PREDICTION SANITIZATION (CRITICAL FIX) ---
-    # Convert all feature columns to numeric, coercing errors
-    for col in predict_df_aligned.columns:
-        predict_df_aligned[col] = pd.to_numeric(predict_df_aligned[col], errors='coerce')
-    
+    # Coerce every feature column to numeric in one pass and go straight to one contiguous
+    # float32 block, the layout the trees predict on, so sklearn makes no copy of its own
+    X_predict = np.ascontiguousarray(predict_df_aligned.apply(pd.to_numeric, errors='coerce').to_numpy(dtype=np.float32))
     # Fill any values that couldn't be converted with 0
-    predict_df_aligned = predict_df_aligned.fillna(0)
+    X_predict[np.isnan(X_predict)] = 0
     logging.info("Sanitized all feature columns to be numeric.")
 
     # --- Make Predictions ---
     logging.info("\n--- Oracle is now predicting FPL points... ---")
-    predictions = model.predict(predict_df_aligned)
+    predictions = model.predict(X_predict)
     
     # --- Create the Final Intelligence Report ---
-    player_info['Predicted_Points'] = predictions
+    player_info['Predicted_Points'] = predictions.astype(np.float32)
     final_report = player_info.sort_values(by='Predicted_Points', ascending=False).reset_index(drop=True)
     
     os.makedirs(PREDICTIONS_OUTPUT_DIR, exist_ok=True)
     output_path = os.path.join(PREDICTIONS_OUTPUT_DIR, PREDICTIONS_FILE)
-    final_report.to_csv(output_path, index=False)
+    final_report.to_parquet(output_path, engine='pyarrow', compression='zstd', index=False)
+    final_report.to_csv(os.path.join(PREDICTIONS_OUTPUT_DIR, PREDICTIONS_CSV_FILE), index=False)
     
     logging.info(f"\n--- Prediction Complete ---")
     print("\nTop 20 Predicted Scorers (Experiment):")
@@ -1,15 +1,38 @@
 import requests
+from requests.adapters import HTTPAdapter
 import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
 import os
 import logging
 import time
-import random
 import json
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date
+from joblib import Memory
+from _http_utils import RateLimiter
 
-def fetch_fpl_data(url, max_retries=3, timeout=10):
+MAX_WORKERS = 16 # Element-summary requests in flight at once
+REQUESTS_PER_SECOND = 10 # Global request rate across all workers, retries included
+BATCH_SIZE = 50 # Players whose histories are buffered before each write
+
+# Element-summary responses are cached on disk for the day, so a rerun only downloads what it hasn't seen today
+FPL_CACHE = Memory("cache/fpl", verbose=0)
+
+def create_session(pool_size: int = MAX_WORKERS) -> requests.Session:
+    """One session for every call, so TCP/TLS connections are reused across requests and threads."""
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+def fetch_fpl_data(session, url, limiter=None, max_retries=3, timeout=10):
     for attempt in range(max_retries + 1):
         try:
-            response = requests.get(url, timeout=timeout)
+            if limiter:
+                limiter.wait()
+            response = session.get(url, timeout=timeout)
             if response.status_code == 429:
                 if attempt == max_retries:
                     logging.error(f"429 Too Many Requests for {url}, retries exhausted")
@@ -35,6 +58,41 @@ def fetch_fpl_data(url, max_retries=3, timeout=10):
             logging.error(f"Request error for {url}: {e}")
             raise
 
+@FPL_CACHE.cache(ignore=['session', 'limiter'])
+def fetch_fpl_data_cached(session, url, limiter, day_bucket):
+    """fetch_fpl_data keyed on (url, day_bucket); failed fetches raise and are not cached."""
+    return fetch_fpl_data(session, url, limiter)
+
+def fetch_player_history(session, limiter, base_url, player_id, day_bucket):
+    """Returns one player's gameweek rows tagged with player_id, or [] if the fetch fails."""
+    try:
+        player_detail_data = fetch_fpl_data_cached(session, f"{base_url}element-summary/{player_id}/", limiter, day_bucket)
+    except (requests.exceptions.RequestException, json.JSONDecodeError) as e:
+        logging.warning(f"Could not fetch data for player_id {player_id}: {e}")
+        return []
+    history = player_detail_data.get('history', [])
+    for gw in history:
+        gw['player_id'] = player_id
+    return history
+
+def write_history_batch(writer, rows, parquet_path, csv_path):
+    """
+    Appends one batch of gameweek rows to the Parquet output and its CSV copy.
+    The Parquet writer is opened on the first batch with that batch's schema, and later
+    batches are aligned to it.
+    """
+    batch_df = pd.DataFrame(rows)
+    if writer is None:
+        table = pa.Table.from_pandas(batch_df, preserve_index=False)
+        writer = pq.ParquetWriter(parquet_path, table.schema, compression='zstd')
+        batch_df.to_csv(csv_path, index=False)
+    else:
+        batch_df = batch_df.reindex(columns=writer.schema.names)
+        table = pa.Table.from_pandas(batch_df, schema=writer.schema, preserve_index=False)
+        batch_df.to_csv(csv_path, mode='a', header=False, index=False)
+    writer.write_table(table)
+    return writer
+
 def main():
     """
     Connects to the official FPL API to download master player data and
@@ -46,11 +104,13 @@ def main():
     BASE_URL = "https://fantasy.premierleague.com/api/"
     OUTPUT_DIR = "processed_data"
     os.makedirs(OUTPUT_DIR, exist_ok=True)
+    session = create_session()
+    limiter = RateLimiter(REQUESTS_PER_SECOND)
 
     # --- 1. Fetch the Master Bootstrap Data ---
     try:
         logging.info("Fetching master bootstrap data from FPL API...")
-        bootstrap_data = fetch_fpl_data(f"{BASE_URL}bootstrap-static/")
+        bootstrap_data = fetch_fpl_data(session, f"{BASE_URL}bootstrap-static/", limiter)
         logging.info("Successfully fetched bootstrap data.")
     except (requests.exceptions.RequestException, json.JSONDecodeError) as e:
         logging.error(f"Failed to fetch bootstrap data: {e}")
@@ -64,20 +124,17 @@ def main():
     teams = {team['code']: team['name'] for team in bootstrap_data.get('teams', [])}
     positions = {pos['id']: pos['singular_name_short'] for pos in bootstrap_data.get('element_types', [])}
 
-    player_directory_data = []
-    for p in players:
-        player_directory_data.append({
-            'player_id': p['id'],
-            'first_name': p['first_name'],
-            'second_name': p['second_name'],
-            'full_name': f"{p['first_name']} {p['second_name']}",
-            # Use the player's 'team_code' to look up in our new 'teams' dictionary
-            'team_name': teams.get(p['team_code'], 'Unknown'), 
-            'position': positions.get(p['element_type'], 'Unknown'),
-            'current_price': p['now_cost'] / 10.0
-        })
-    
-    player_directory_df = pd.DataFrame(player_directory_data)
+    # Built column by column, so pandas gets one list per column instead of a dict per player
+    player_directory_df = pd.DataFrame({
+        'player_id': [p['id'] for p in players],
+        'first_name': [p['first_name'] for p in players],
+        'second_name': [p['second_name'] for p in players],
+        'full_name': [f"{p['first_name']} {p['second_name']}" for p in players],
+        # Use the player's 'team_code' to look up in our new 'teams' dictionary
+        'team_name': [teams.get(p['team_code'], 'Unknown') for p in players],
+        'position': [positions.get(p['element_type'], 'Unknown') for p in players],
+        'current_price': [p['now_cost'] / 10.0 for p in players],
+    })
     player_directory_output_path = os.path.join(OUTPUT_DIR, "fpl_player_directory.csv")
     try:
         player_directory_df.to_csv(player_directory_output_path, index=False)
@@ -89,39 +146,43 @@ def main():
 
     # --- 3. Fetch Detailed Gameweek History (No changes needed here) ---
     logging.info("\nFetching detailed gameweek history for all players...")
-    all_gameweek_data = []
     player_ids = player_directory_df['player_id'].tolist()
+    gameweek_history_output_path = os.path.join(OUTPUT_DIR, "fpl_gameweek_history.parquet") # Primary output
+    gameweek_history_csv_path = os.path.join(OUTPUT_DIR, "fpl_gameweek_history.csv") # Human-readable copy
 
-    for i, player_id in enumerate(player_ids):
-        try:
-            player_detail_url = f"{BASE_URL}element-summary/{player_id}/"
-            time.sleep(random.uniform(0.1, 0.3))
-            player_detail_data = fetch_fpl_data(player_detail_url)
-
-            for gw in player_detail_data.get('history', []):
-                gw['player_id'] = player_id
-                all_gameweek_data.append(gw)
-
-            if (i + 1) % 50 == 0:
-                logging.info(f"Processed {i + 1}/{len(player_ids)} players...")
+    # Histories are fetched concurrently over the shared session; map() yields them in player
+    # order, so the output rows keep the same order as a sequential run.
+    # Rows are flushed every BATCH_SIZE players, so only one batch is ever held in memory.
+    day_bucket = date.today().isoformat() # Fixed for the whole run, so a run crossing midnight stays consistent
+    batch = []
+    total_rows = 0
+    writer = None
+    try:
+        with ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
+            histories = executor.map(lambda player_id: fetch_player_history(session, limiter, BASE_URL, player_id, day_bucket), player_ids)
+            for i, history in enumerate(histories):
+                batch.extend(history)
+                if (i + 1) % BATCH_SIZE == 0 or i + 1 == len(player_ids):
+                    if batch:
+                        writer = write_history_batch(writer, batch, gameweek_history_output_path, gameweek_history_csv_path)
+                        total_rows += len(batch)
+                        batch = []
+                    logging.info(f"Processed {i + 1}/{len(player_ids)} players...")
+    except Exception as e:
+        logging.error(f"Failed to save gameweek history: {e}")
+        return
+    finally:
+        if writer:
+            writer.close()
+        session.close()
 
-        except (requests.exceptions.RequestException, json.JSONDecodeError) as e:
-            logging.warning(f"Could not fetch data for player_id {player_id}: {e}")
-            continue
-    
-    if not all_gameweek_data:
+    if not total_rows:
         logging.error("No gameweek history could be fetched. Aborting.")
         return
 
-    gameweek_history_df = pd.DataFrame(all_gameweek_data)
-    gameweek_history_output_path = os.path.join(OUTPUT_DIR, "fpl_gameweek_history.csv")
-    try:
-        gameweek_history_df.to_csv(gameweek_history_output_path, index=False)
-        logging.info(f"\n--- FPL API Data Acquisition Complete ---")
-        logging.info(f"Gameweek history created with {len(gameweek_history_df)} entries.")
-        logging.info(f"File saved to: {gameweek_history_output_path}")
-    except Exception as e:
-        logging.error(f"Failed to save gameweek history CSV: {e}")
+    logging.info(f"\n--- FPL API Data Acquisition Complete ---")
+    logging.info(f"Gameweek history created with {total_rows} entries.")
+    logging.info(f"File saved to: {gameweek_history_output_path}")
 
 if __name__ == '__main__':
     main()
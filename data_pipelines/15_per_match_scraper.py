@@ -1,129 +1,92 @@
+import httpx
 import pandas as pd
 import os
 import logging
 import time
 import random
-from selenium import webdriver
-from selenium.webdriver.chrome.service import Service as ChromeService
-from selenium.webdriver.chrome.options import Options
+import queue
+import re
+from urllib.parse import quote_plus
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
 from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
-from webdriver_manager.chrome import ChromeDriverManager
-from bs4 import BeautifulSoup
+import lxml.html
+from lxml import etree
 from io import StringIO
-
-def get_html_with_selenium(url: str, wait_condition) -> str | None:
-    """Fetches the full HTML content of a page using Selenium with maximum stealth options.
-
-    Optionally, set the CHROME_BINARY environment variable to specify the Chrome binary path.
-    If not set, Selenium will auto-detect Chrome.
-    """
-    # This robust helper function remains our core browser engine.
-    options = Options()
-    chrome_binary = os.environ.get('CHROME_BINARY')
-    if chrome_binary:
-        options.binary_location = chrome_binary
-    options.add_argument("--headless")
-    options.add_argument("--no-sandbox")
-    options.add_argument("--disable-dev-shm-usage")
-    options.add_argument("--disable-gpu")
-    options.add_argument("--window-size=1920,1200")
-    options.add_argument("user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/94.0.4606.81 Safari/537.36")
-    options.add_argument('--disable-blink-features=AutomationControlled')
-    options.add_experimental_option("excludeSwitches", ["enable-automation", "enable-logging"])
-    options.add_experimental_option('useAutomationExtension', False)
-
-    driver = None
+from _selenium_utils import SeleniumFetcher
+from _http_utils import create_http_client, fetch_static
+from _sofascore_utils import SEARCH_PAGE_TEMPLATE, search_api
+
+# Player links inside the block that holds the "Players" heading of the search results
+PLAYER_LINKS_XPATH = etree.XPath("(//div[.='Players'])[1]/ancestor::div[1]//a[contains(@href, '/player/')]")
+
+def find_player_in_api_results(results: list, second_name: str) -> str | None:
+    """Returns the page URL of the first player search result whose name contains second_name."""
+    for result in results:
+        entity = result.get('entity', {})
+        if result.get('type') == 'player' and second_name.lower() in entity.get('name', '').lower():
+            return f"https://www.sofascore.com/player/{entity['slug']}/{entity['id']}"
+    return None
+
+def find_player_page_url(search_html: str, second_name: str) -> str | None:
+    """Returns the first player link under the search page's "Players" section matching second_name."""
+    for link in PLAYER_LINKS_XPATH(lxml.html.fromstring(search_html)):
+        if second_name.lower() in link.text_content().lower():
+            return "https://www.sofascore.com" + link.get('href')
+    return None
+
+def scraped_player_ids(output_dir: str) -> set[int]:
+    """Player IDs already saved, from the player_id=<id> partitions and any legacy per-player CSVs."""
+    done = set()
+    for name in os.listdir(output_dir):
+        partition = re.fullmatch(r'player_id=(\d+)', name)
+        if partition and os.path.isfile(os.path.join(output_dir, name, "matches.parquet")):
+            done.add(int(partition.group(1)))
+        legacy = re.fullmatch(r'player_(\d+)_.*\.csv', name)
+        if legacy:
+            done.add(int(legacy.group(1)))
+    return done
+
+def scrape_player(client: httpx.Client, fetchers: queue.Queue, player, output_path: str) -> bool:
+    """Finds and saves one player's per-match data; returns True if a file was written."""
+    player_name = player.full_name
+    player_id = player.player_id
     try:
-        service = ChromeService(ChromeDriverManager().install())
-        driver = webdriver.Chrome(service=service, options=options)
-        driver.execute_script("Object.defineProperty(navigator, 'webdriver', {get: () => undefined})")
-        driver.get(url)
-        WebDriverWait(driver, 20).until(wait_condition)
-        time.sleep(3)
-        return driver.page_source
-    except Exception as e:
-        logging.error(f"Selenium error for URL {url}: {e}")
-        return None
-    finally:
-        if driver:
-            driver.quit()
-
-def main():
-    """
-    Scrapes per-match player performance data from SofaScore in intelligent batches.
-    The script is resumable and will pick up where it left off.
-    """
-    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
-
-    # --- Configuration ---
-    PLAYER_DIRECTORY_FILE = "processed_data/fpl_player_directory.csv"
-    OUTPUT_DIR = "raw_data/sofascore_per_match"
-    BATCH_SIZE = 50
-    os.makedirs(OUTPUT_DIR, exist_ok=True)
-    
-    if not os.path.exists(PLAYER_DIRECTORY_FILE):
-        logging.error(f"Player directory not found at {PLAYER_DIRECTORY_FILE}. Aborting.")
-        return
-
-    player_df = pd.read_csv(PLAYER_DIRECTORY_FILE)
-    logging.info(f"Found {len(player_df)} players in the FPL directory.")
-
-    players_processed_in_batch = 0
-
-    for index, player in player_df.iterrows():
-        player_name = player['full_name']
-        player_id = player['player_id']
-
-        output_filename = f"player_{player_id}_{player_name.replace(' ', '_')}.csv"
-        output_path = os.path.join(OUTPUT_DIR, output_filename)
-
-        if os.path.exists(output_path):
-            continue
-
-        if players_processed_in_batch >= BATCH_SIZE:
-            logging.info(f"Batch limit of {BATCH_SIZE} reached. Stopping.")
-            logging.info("Re-run the script to process the next batch.")
-            break
-
         logging.info(f"--- Scouting Player: {player_name} (ID: {player_id}) ---")
         
         all_player_match_data = []
 
-        # --- "PATIENT SCOUT" UPGRADE ---
-        # 1. Search for the player on SofaScore
-        search_url = f"https://www.sofascore.com/search/results?q={player_name.replace(' ', '+')}"
-        # Wait for the page body to load
-        wait_condition = EC.presence_of_element_located((By.CSS_SELECTOR, "body"))
-        search_html = get_html_with_selenium(search_url, wait_condition)
-
-        if not search_html:
-            logging.warning(f"Could not perform search for {player_name}. Skipping.")
-            continue
-        
-        soup = BeautifulSoup(search_html, 'html.parser')
-        
-        player_page_url = None
-        # 2. Defensively look for the "Players" section
-        second_name = player.get('second_name')
-        if not second_name:
+        second_name = player.second_name
+        if pd.isna(second_name) or not second_name:
             logging.warning(f"Player {player_name} has no second_name. Skipping.")
-            continue
-        players_header = soup.find('div', string='Players')
-        if players_header:
-            player_section = players_header.find_parent('div')
-            player_links = player_section.find_all('a', href=lambda href: href and '/player/' in href)
-
-            for link in player_links:
-                if second_name.lower() in link.text.lower():
-                    player_page_url = "https://www.sofascore.com" + link['href']
-                    logging.info(f"Found player page URL: {player_page_url}")
-                    break
+            return False
+
+        # --- "PATIENT SCOUT" UPGRADE ---
+        # 1. Search for the player on SofaScore: JSON search API first, then the search page
+        player_page_url = find_player_in_api_results(search_api(client, player_name), second_name)
+        search_url = SEARCH_PAGE_TEMPLATE.format(query=quote_plus(player_name))
+        if not player_page_url:
+            search_html, _ = fetch_static(client, search_url, retries=1, strip_comments=False)
+            # 2. Defensively look for the "Players" section
+            player_page_url = find_player_page_url(search_html, second_name) if search_html else None
+
+        if not player_page_url:
+            logging.info(f"No player link in the static search page for {player_name}. Falling back to Selenium.")
+            fetcher = fetchers.get()
+            try:
+                search_html = fetcher.fetch(search_url)
+            finally:
+                fetchers.put(fetcher)
+
+            if not search_html:
+                logging.warning(f"Could not perform search for {player_name}. Skipping.")
+                return False
+            player_page_url = find_player_page_url(search_html, second_name)
 
         if not player_page_url:
             logging.warning(f"Could not find a matching player page link for {player_name}. Skipping.")
-            continue
+            return False
+        logging.info(f"Found player page URL: {player_page_url}")
 
         # (Placeholder for steps 2-5: navigate to player page, find match log, scrape each match)
         all_player_match_data.append({
@@ -133,20 +96,91 @@ def main():
             'clearances': 0, 'interceptions': 1
         })
 
+        saved = False
         if all_player_match_data:
-            player_matches_df = pd.DataFrame(all_player_match_data)
-            player_matches_df.to_csv(output_path, index=False)
+            # Each player writes its own partition, so workers share no output state; the
+            # player_id lives in the partition path rather than in the file
+            player_matches_df = pd.DataFrame(all_player_match_data).drop(columns='player_id')
+            os.makedirs(os.path.dirname(output_path), exist_ok=True)
+            player_matches_df.to_parquet(output_path, engine='pyarrow', compression='zstd', index=False)
             logging.info(f"Successfully scraped and saved REAL data structure for {player_name}.")
-            players_processed_in_batch += 1
+            saved = True
         else:
             logging.warning(f"No match data could be compiled for {player_name}.")
 
+        # The pause only spaces out this worker's own requests
         human_delay = random.uniform(5, 12)
         logging.info(f"Pausing for {human_delay:.2f} seconds before next player...")
         time.sleep(human_delay)
+        return saved
+    except Exception as e:
+        logging.error(f"Failed to process player {player_name}: {e}")
+        return False
+
+def main():
+    """
+    Scrapes per-match player performance data from SofaScore in intelligent batches.
+    The script is resumable and will pick up where it left off.
+    """
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+    # --- Configuration ---
+    PLAYER_DIRECTORY_FILE = "processed_data/fpl_player_directory.csv"
+    OUTPUT_DIR = "raw_data/sofascore_per_match"
+    BATCH_SIZE = 50
+    MAX_WORKERS = 4  # Players scouted at once; each may launch its own headless browser
+    os.makedirs(OUTPUT_DIR, exist_ok=True)
+    
+    if not os.path.exists(PLAYER_DIRECTORY_FILE):
+        logging.error(f"Player directory not found at {PLAYER_DIRECTORY_FILE}. Aborting.")
+        return
+
+    # Only the columns the scout uses, with their types given up front
+    player_df = pd.read_csv(
+        PLAYER_DIRECTORY_FILE,
+        usecols=['player_id', 'full_name', 'second_name'],
+        dtype={'player_id': 'int32', 'full_name': 'string', 'second_name': 'string'},
+        engine='pyarrow',
+    )
+    logging.info(f"Found {len(player_df)} players in the FPL directory.")
+
+    # Players are saved as one Hive-style dataset, raw_data/sofascore_per_match/player_id=<id>/,
+    # which downstream steps can read in a single scan instead of opening a CSV per player
+    done_ids = scraped_player_ids(OUTPUT_DIR)
+    tasks = []
+    for player in player_df.itertuples(index=False):
+        if player.player_id not in done_ids:
+            output_path = os.path.join(OUTPUT_DIR, f"player_id={player.player_id}", "matches.parquet")
+            tasks.append((player, output_path))
+
+    players_processed_in_batch = 0
+
+    # Searches go over the shared HTTP client first. Browsers are only launched for searches whose
+    # results aren't in the static HTML, from a pool of at most MAX_WORKERS that workers check out.
+    client = create_http_client()
+    fetchers = queue.Queue()
+    for _ in range(MAX_WORKERS):
+        # Waits for the page body, the only element every search page is sure to have
+        fetchers.put(SeleniumFetcher(wait_for=(By.CSS_SELECTOR, "body"), binary_location=os.environ.get('CHROME_BINARY')))
+    try:
+        with ThreadPoolExecutor(max_workers=MAX_WORKERS) as pool:
+            pending = iter(tasks)
+            # Players go out in waves no larger than what is left of the batch, so a run never
+            # saves more than BATCH_SIZE players
+            while players_processed_in_batch < BATCH_SIZE:
+                wave = list(islice(pending, min(MAX_WORKERS, BATCH_SIZE - players_processed_in_batch)))
+                if not wave:
+                    break
+                players_processed_in_batch += sum(pool.map(lambda task: scrape_player(client, fetchers, *task), wave))
+            else:
+                logging.info(f"Batch limit of {BATCH_SIZE} reached. Stopping.")
+                logging.info("Re-run the script to process the next batch.")
+    finally:
+        client.close()
+        while not fetchers.empty():
+            fetchers.get().close()
 
     logging.info(f"\n--- Batch run complete. Processed {players_processed_in_batch} new players. ---")
 
 if __name__ == '__main__':
     main()
-
@@ -1,3 +1,4 @@
+import functools
 import pandas as pd
 import os
 import logging
@@ -9,17 +10,13 @@ from selenium.webdriver.chrome.options import Options
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
-from webdriver_manager.chrome import ChromeDriverManager
 from bs4 import BeautifulSoup
 from io import StringIO
+from _selenium_utils import driver_path
 
-def get_html_with_selenium(url: str, wait_condition) -> str | None:
-    """Fetches the full HTML content of a page using Selenium with maximum stealth options.
-
-    Optionally, set the CHROME_BINARY environment variable to specify the Chrome binary path.
-    If not set, Selenium will auto-detect Chrome.
-    """
-    # This robust helper function remains our core browser engine.
+@functools.lru_cache(maxsize=1)
+def _chrome_options() -> Options:
+    """Builds the stealth Chrome options once per process; every fetch launches with the same set."""
     options = Options()
     chrome_binary = os.environ.get('CHROME_BINARY')
     if chrome_binary:
@@ -33,11 +30,19 @@ def get_html_with_selenium(url: str, wait_condition) -> str | None:
     options.add_argument('--disable-blink-features=AutomationControlled')
     options.add_experimental_option("excludeSwitches", ["enable-automation", "enable-logging"])
     options.add_experimental_option('useAutomationExtension', False)
+    return options
 
+def get_html_with_selenium(url: str, wait_condition) -> str | None:
+    """Fetches the full HTML content of a page using Selenium with maximum stealth options.
+
+    Optionally, set the CHROME_BINARY environment variable to specify the Chrome binary path.
+    If not set, Selenium will auto-detect Chrome.
+    """
+    # This robust helper function remains our core browser engine.
     driver = None
     try:
-        service = ChromeService(ChromeDriverManager().install())
-        driver = webdriver.Chrome(service=service, options=options)
+        service = ChromeService(driver_path())
+        driver = webdriver.Chrome(service=service, options=_chrome_options())
         driver.execute_script("Object.defineProperty(navigator, 'webdriver', {get: () => undefined})")
         driver.get(url)
         WebDriverWait(driver, 20).until(wait_condition)
@@ -102,7 +107,7 @@ def main():
             logging.warning(f"Could not perform search for {player_name}. Skipping.")
             continue
         
-        soup = BeautifulSoup(search_html, 'html.parser')
+        soup = BeautifulSoup(search_html, 'lxml')
         # Find all links that point to a player page
         player_links = soup.find_all('a', href=lambda href: href and '/player/' in href)
         
@@ -1,45 +1,94 @@
+import httpx
 import pandas as pd
 import os
 import logging
 import time
 import random
-from selenium import webdriver
-from selenium.webdriver.chrome.service import Service as ChromeService
-from selenium.webdriver.chrome.options import Options
+import queue
+from urllib.parse import quote_plus
+from concurrent.futures import ThreadPoolExecutor
 from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
-from webdriver_manager.chrome import ChromeDriverManager
-from bs4 import BeautifulSoup
-
-def get_html_with_selenium(url: str, wait_condition) -> str | None:
-    """Fetches the full HTML content of a page using Selenium."""
-    # This robust helper function remains our core browser engine.
-    options = Options()
-    options.binary_location = "C:\\Program Files\\Google\\Chrome\\Application\\chrome.exe"
-    options.add_argument("--headless")
-    options.add_argument("--no-sandbox")
-    options.add_argument("--disable-dev-shm-usage")
-    options.add_argument("user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/94.0.4606.81 Safari/537.36")
-    options.add_argument('--disable-blink-features=AutomationControlled')
-    options.add_experimental_option("excludeSwitches", ["enable-automation", "enable-logging"])
-    options.add_experimental_option('useAutomationExtension', False)
-
-    driver = None
+import lxml.html
+from lxml import etree
+from _selenium_utils import SeleniumFetcher
+from _http_utils import create_http_client, fetch_static
+from _sofascore_utils import SEARCH_PAGE_TEMPLATE, search_api
+
+MATCH_FILENAME_TEMPLATE = "{date}_{home}_vs_{away}.csv"
+_UNDERSCORE = str.maketrans(' ', '_') # Team names -> filename parts
+MATCH_LINKS_XPATH = etree.XPath("//a[contains(@href, '/football/')]")
+
+def find_match_in_api_results(results: list, home_team: str, away_team: str) -> str | None:
+    """Returns the match page URL of the first event search result between the two teams."""
+    for result in results:
+        event = result.get('entity', {})
+        if result.get('type') != 'event':
+            continue
+        home_name = event.get('homeTeam', {}).get('name', '').lower()
+        away_name = event.get('awayTeam', {}).get('name', '').lower()
+        if home_team.lower() in home_name and away_team.lower() in away_name:
+            return f"https://www.sofascore.com/football/match/{event['slug']}/{event['customId']}#id:{event['id']}"
+    return None
+
+def find_match_page_url(search_html: str, home_team: str, away_team: str) -> str | None:
+    """Returns the first search-result match link naming both teams."""
+    for link in MATCH_LINKS_XPATH(lxml.html.fromstring(search_html)):
+        # Heuristic: Find a link containing both team names
+        link_text = link.text_content().lower()
+        if home_team.lower() in link_text and away_team.lower() in link_text:
+            return "https://www.sofascore.com" + link.get('href')
+    return None
+
+def scrape_match(client: httpx.Client, fetchers: queue.Queue, home_team: str, away_team: str, output_path: str) -> None:
+    """Finds one fixture's SofaScore match page and saves its stats."""
     try:
-        service = ChromeService(ChromeDriverManager().install())
-        driver = webdriver.Chrome(service=service, options=options)
-        driver.execute_script("Object.defineProperty(navigator, 'webdriver', {get: () => undefined})")
-        driver.get(url)
-        WebDriverWait(driver, 25).until(wait_condition)
-        time.sleep(3) # Extra sleep for dynamic content
-        return driver.page_source
+        logging.info(f"--- Scouting Match: {home_team} vs {away_team} ---")
+        
+        # --- NEW FIXTURE-CENTRIC LOGIC ---
+        # 1. Search for the match on SofaScore: JSON search API first, then the search page
+        match_page_url = find_match_in_api_results(search_api(client, f"{home_team} {away_team}"), home_team, away_team)
+        search_url = SEARCH_PAGE_TEMPLATE.format(query=quote_plus(f"{home_team} {away_team}"))
+        if not match_page_url:
+            search_html, _ = fetch_static(client, search_url, retries=1, strip_comments=False)
+            # 2. Find the correct match link from the search results
+            match_page_url = find_match_page_url(search_html, home_team, away_team) if search_html else None
+
+        if not match_page_url:
+            logging.info(f"No match link in the static search page for {home_team} vs {away_team}. Falling back to Selenium.")
+            fetcher = fetchers.get()
+            try:
+                search_html = fetcher.fetch(search_url)
+            finally:
+                fetchers.put(fetcher)
+
+            if not search_html:
+                logging.warning(f"Could not perform search for match: {home_team} vs {away_team}. Skipping.")
+                return
+            match_page_url = find_match_page_url(search_html, home_team, away_team)
+        
+        if not match_page_url:
+            logging.warning(f"Could not find a matching page link for {home_team} vs {away_team}. Skipping.")
+            return
+        logging.info(f"Found match page URL: {match_page_url}")
+
+        # --- Placeholder for the complex data extraction from the match page ---
+        # This part will be built out next, but we have solved the primary navigation problem.
+        placeholder_data = {
+            'player_name': ['Player A', 'Player B'],
+            'sofascore_rating': [7.5, 8.1],
+            'xG': [0.8, 1.2], 'xA': [0.3, 0.1] 
+            # ... etc. for all players and all stats in the match
+        }
+        # Each fixture writes its own file, so workers share no output state
+        match_stats_df = pd.DataFrame(placeholder_data)
+        match_stats_df.to_csv(output_path, index=False)
+        logging.info(f"Successfully scraped and saved placeholder data for {home_team} vs {away_team}.")
+        # --- End of placeholder ---
+        
+        # The pause only spaces out this worker's own requests
+        time.sleep(random.uniform(5, 10))
     except Exception as e:
-        logging.error(f"Selenium error for URL {url}: {e}")
-        return None
-    finally:
-        if driver:
-            driver.quit()
+        logging.error(f"Failed to process match {home_team} vs {away_team}: {e}")
 
 def main():
     """
@@ -52,6 +101,7 @@ def main():
     FIXTURES_FILE = "processed_data/fixtures_master.csv"
     SEASON_TO_SCRAPE = "2024-2025"
     OUTPUT_DIR = "raw_data/sofascore_match_stats" # New dedicated directory
+    MAX_WORKERS = 4  # Fixtures scouted at once; each may launch its own headless browser
     os.makedirs(OUTPUT_DIR, exist_ok=True)
     
     if not os.path.exists(FIXTURES_FILE):
@@ -63,61 +113,36 @@ def main():
     target_fixtures = fixtures_df[fixtures_df['Season'] == SEASON_TO_SCRAPE].dropna(subset=['Home_Goals'])
     logging.info(f"Found {len(target_fixtures)} historical matches for season {SEASON_TO_SCRAPE}.")
 
-    for index, fixture in target_fixtures.iterrows():
-        home_team = fixture['Home']
-        away_team = fixture['Away']
-        match_date = pd.to_datetime(fixture['Date']).strftime('%Y-%m-%d')
+    # One directory scan up front instead of a stat call per fixture
+    done_files = {entry.name for entry in os.scandir(OUTPUT_DIR)}
+    tasks = []
+    # Dates are parsed in one vectorized call; 'mixed' parses each value on its own, as the old per-row call did
+    match_dates = pd.to_datetime(target_fixtures['Date'], format='mixed').dt.strftime('%Y-%m-%d')
+    for home_team, away_team, match_date in zip(target_fixtures['Home'], target_fixtures['Away'], match_dates):
         
-        output_filename = f"{match_date}_{home_team.replace(' ', '_')}_vs_{away_team.replace(' ', '_')}.csv"
+        output_filename = MATCH_FILENAME_TEMPLATE.format(date=match_date, home=home_team.translate(_UNDERSCORE), away=away_team.translate(_UNDERSCORE))
         output_path = os.path.join(OUTPUT_DIR, output_filename)
 
-        if os.path.exists(output_path):
+        if output_filename in done_files:
             logging.info(f"Match data for {home_team} vs {away_team} on {match_date} already exists. Skipping.")
             continue
 
-        logging.info(f"--- Scouting Match: {home_team} vs {away_team} ---")
-        
-        # --- NEW FIXTURE-CENTRIC LOGIC ---
-        # 1. Search for the match on SofaScore
-        search_url = f"https://www.sofascore.com/search/results?q={home_team.replace(' ', '+')}+{away_team.replace(' ', '+')}"
-        # Wait for a search result link to appear
-        wait_condition = EC.presence_of_element_located((By.CSS_SELECTOR, "a[href*='/football/']"))
-        search_html = get_html_with_selenium(search_url, wait_condition)
-
-        if not search_html:
-            logging.warning(f"Could not perform search for match: {home_team} vs {away_team}. Skipping.")
-            continue
-
-        # 2. Find the correct match link from the search results
-        soup = BeautifulSoup(search_html, 'html.parser')
-        match_links = soup.find_all('a', href=lambda href: href and '/football/' in href)
-        
-        match_page_url = None
-        for link in match_links:
-            # Heuristic: Find a link containing both team names
-            if home_team.lower() in link.text.lower() and away_team.lower() in link.text.lower():
-                match_page_url = "https://www.sofascore.com" + link['href']
-                logging.info(f"Found match page URL: {match_page_url}")
-                break
-        
-        if not match_page_url:
-            logging.warning(f"Could not find a matching page link for {home_team} vs {away_team}. Skipping.")
-            continue
+        tasks.append((home_team, away_team, output_path))
 
-        # --- Placeholder for the complex data extraction from the match page ---
-        # This part will be built out next, but we have solved the primary navigation problem.
-        placeholder_data = {
-            'player_name': ['Player A', 'Player B'],
-            'sofascore_rating': [7.5, 8.1],
-            'xG': [0.8, 1.2], 'xA': [0.3, 0.1] 
-            # ... etc. for all players and all stats in the match
-        }
-        match_stats_df = pd.DataFrame(placeholder_data)
-        match_stats_df.to_csv(output_path, index=False)
-        logging.info(f"Successfully scraped and saved placeholder data for {home_team} vs {away_team}.")
-        # --- End of placeholder ---
-        
-        time.sleep(random.uniform(5, 10))
+    # Searches go over the shared HTTP client first. Browsers are only launched for searches whose
+    # results aren't in the static HTML, from a pool of at most MAX_WORKERS that workers check out.
+    client = create_http_client()
+    fetchers = queue.Queue()
+    for _ in range(MAX_WORKERS):
+        # Waits for a search result link to appear
+        fetchers.put(SeleniumFetcher(wait_for=(By.CSS_SELECTOR, "a[href*='/football/']")))
+    try:
+        with ThreadPoolExecutor(max_workers=MAX_WORKERS) as pool:
+            list(pool.map(lambda task: scrape_match(client, fetchers, *task), tasks))
+    finally:
+        client.close()
+        while not fetchers.empty():
+            fetchers.get().close()
 
     logging.info("\n--- SofaScore Match Scraping Complete ---")
 
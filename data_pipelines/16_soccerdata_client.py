@@ -14,7 +14,8 @@ def main():
     LEAGUE = "ENG-Premier League"
     SEASON = "24-25"
     OUTPUT_DIR = "processed_data"
-    OUTPUT_FILE = "sofascore_per_match_stats.csv"
+    OUTPUT_FILE = "sofascore_per_match_stats.parquet"
+    OUTPUT_CSV_FILE = "sofascore_per_match_stats.csv" # Human-readable copy
     os.makedirs(OUTPUT_DIR, exist_ok=True)
 
     try:
@@ -34,7 +35,8 @@ def main():
         # --- 3. Save the Data ---
         # The data comes back as a clean pandas DataFrame.
         output_path = os.path.join(OUTPUT_DIR, OUTPUT_FILE)
-        player_match_stats.to_csv(output_path, index=False)
+        player_match_stats.to_parquet(output_path, engine='pyarrow', compression='zstd', index=False)
+        player_match_stats.to_csv(os.path.join(OUTPUT_DIR, OUTPUT_CSV_FILE), index=False)
         
         logging.info("\n--- SofaScore Data Acquisition Complete ---")
         logging.info(f"Complete per-match dataset saved to: {output_path}")
@@ -0,0 +1,162 @@
+from io import BytesIO
+import numpy as np
+import pandas as pd
+from lxml import etree
+
+# Guards against pathological markup: no FBREF header spans more than a few dozen columns,
+# and a real stats table is a few hundred KB at most
+MAX_COLSPAN = 50
+MAX_TABLE_BYTES = 5_000_000
+
+# Compiled once and reused for every table and row, rather than parsing the expression on each call
+HEADER_ROWS_XPATH = etree.XPath('./thead/tr')
+BODY_ROWS_XPATH = etree.XPath('./tbody/tr|./tr')
+CELLS_XPATH = etree.XPath('./th|./td')
+DATA_CELLS_XPATH = etree.XPath('./td')
+
+# Known FBREF stat columns, declared up front so the CSV reader skips type inference.
+# The bounded-cardinality text columns (20 squads, a handful of positions) are stored as categories.
+FBREF_DTYPES = {
+    'Player': 'string', 'Nation': 'category', 'Pos': 'category', 'Squad': 'category', 'Age': 'string',
+    'Born': 'float32', 'MP': 'float32', 'Starts': 'float32', 'Min': 'float32', '90s': 'float32',
+    'Gls': 'float32', 'Ast': 'float32', 'G+A': 'float32', 'G-PK': 'float32', 'PK': 'float32', 'PKatt': 'float32',
+    'CrdY': 'float32', 'CrdR': 'float32', 'xG': 'float32', 'npxG': 'float32', 'xAG': 'float32',
+}
+
+def read_stats_csv(filepath) -> pd.DataFrame:
+    """Reads a stats CSV with the multithreaded pyarrow parser into Arrow-backed columns."""
+    df = pd.read_csv(filepath, engine="pyarrow", dtype_backend="pyarrow", dtype=FBREF_DTYPES)
+    # Unlike the default C parser, pyarrow keeps repeated headers (e.g. 'Gls' for totals and per 90)
+    # as exact duplicates, so rename them to 'Gls.1', 'Gls.2', ... the same way the C parser does.
+    seen = {}
+    columns = []
+    for col in df.columns:
+        if col in seen:
+            seen[col] += 1
+            columns.append(f"{col}.{seen[col]}")
+        else:
+            seen[col] = 0
+            columns.append(col)
+    df.columns = columns
+    return df
+
+def find_stats_table(html_content: str):
+    """
+    Stream-parses the page and returns the first <table class="stats_table"> element, or None.
+    Tables before it are cleared as they are passed and parsing stops at the match, so the
+    rest of the (often very large) page is never built into a tree.
+    """
+    source = BytesIO(html_content.encode('utf-8'))
+    for _, elem in etree.iterparse(source, events=('end',), tag='table', html=True, encoding='utf-8'):
+        if 'stats_table' in (elem.get('class') or '').split():
+            return elem
+        elem.clear()
+    return None
+
+def parse_numeric_cells(cells: tuple):
+    """
+    Parses one column of cell texts into a float32 array (empty cells become NaN, ',' thousands
+    separators are stripped, e.g. '2,430' minutes). Returns the cells as a list if any aren't numeric.
+    """
+    try:
+        return np.fromiter(
+            (float(cell.replace(',', '')) if cell else np.nan for cell in cells),
+            dtype=np.float32, count=len(cells),
+        )
+    except ValueError:
+        return list(cells)
+
+def _cell_text(cell) -> str:
+    return ''.join(cell.itertext()).strip()
+
+def _header_span(cell) -> int:
+    """A header cell's colspan clamped to 1..MAX_COLSPAN; a missing, zero or malformed value counts as 1."""
+    colspan = cell.get('colspan', '1')
+    return min(max(int(colspan), 1), MAX_COLSPAN) if colspan.isdigit() else 1
+
+def table_to_dataframe(table, flat: bool = False) -> pd.DataFrame:
+    """
+    Builds a DataFrame straight from an lxml <table> element, without pd.read_html's parser fallbacks.
+    By default multi-row <thead>s (FBREF's over-headers) become MultiIndex columns, matching
+    pd.read_html, and every all-numeric column is read into a float32 array.
+    With flat=True the over-header group is joined onto each column name instead ('Playing Time_MP';
+    ungrouped columns keep their plain name), repeated names are numbered 'xG', 'xG.1', ... as
+    read_html does, and every cell is kept as text.
+    Without a <thead>, the leading rows made only of <th> cells are the header. Repeated header rows
+    and spacer rows that don't span the full table width are skipped; empty cells become None.
+    """
+    header_rows = HEADER_ROWS_XPATH(table)
+    body_rows = BODY_ROWS_XPATH(table)
+    if not header_rows:
+        while body_rows and not DATA_CELLS_XPATH(body_rows[0]):
+            header_rows.append(body_rows.pop(0))
+    header_levels = [
+        [text for cell in CELLS_XPATH(tr) for text in [_cell_text(cell)] * _header_span(cell)]
+        for tr in header_rows
+    ]
+
+    if flat:
+        columns = header_levels[-1] if header_levels else []
+        if len(header_levels) > 1:
+            groups = header_levels[-2] + [''] * len(columns)
+            columns = [f"{group}_{name}" if group else name for group, name in zip(groups, columns)]
+        seen = {}
+        for i, name in enumerate(columns):
+            if name in seen:
+                seen[name] += 1
+                columns[i] = f"{name}.{seen[name]}"
+            else:
+                seen[name] = 0
+    elif len(header_levels) > 1 and all(len(level) == len(header_levels[-1]) for level in header_levels):
+        columns = pd.MultiIndex.from_arrays(header_levels)
+    else:
+        columns = header_levels[-1] if header_levels else None
+
+    # Repeated header rows inside the body are marked with class="thead"
+    rows = [
+        [_cell_text(cell) or None for cell in CELLS_XPATH(tr)]
+        for tr in body_rows if 'thead' not in tr.get('class', '').split()
+    ]
+    width = len(columns) if columns is not None else max(map(len, rows), default=0)
+    # Drop spacer/partial rows that don't span the full table width
+    rows = [row for row in rows if len(row) == width]
+
+    if flat:
+        # Every cell is text, so the dtype is declared rather than inferred (an empty table stays text too)
+        return pd.DataFrame(dict(zip(columns, map(list, zip(*rows)))), columns=columns, dtype='str')
+    if not rows:
+        return pd.DataFrame(columns=columns)
+
+    # Stream each column straight into a float32 array where every cell is numeric, so stats are
+    # typed as they're read instead of being held as strings and converted afterwards
+    df = pd.DataFrame({i: parse_numeric_cells(cells) for i, cells in enumerate(zip(*rows))})
+    if columns is not None:
+        df.columns = columns
+    return df
+
+# Match-log header -> output column name, for the only columns the H2H data keeps
+MATCH_LOG_COLUMNS = {
+    'Date': 'Date', 'Comp': 'Competition', 'Opponent': 'Opponent',
+    'Result': 'Result', 'GF': 'Goals_For', 'GA': 'Goals_Against',
+}
+
+def match_log_to_dataframe(table) -> pd.DataFrame:
+    """
+    Builds the H2H DataFrame straight from an lxml match-log <table>, without serializing the
+    table back to HTML for pd.read_html to parse a second time. Only the MATCH_LOG_COLUMNS cells
+    are read, into one list per column; empty cells become None.
+    """
+    header_rows = HEADER_ROWS_XPATH(table)
+    headers = [_cell_text(cell) for cell in CELLS_XPATH(header_rows[-1])] if header_rows else []
+    # First occurrence of each wanted header, as pd.read_html's un-suffixed name would pick
+    positions = {name: headers.index(name) for name in MATCH_LOG_COLUMNS}
+
+    data = {column: [] for column in MATCH_LOG_COLUMNS.values()}
+    for tr in BODY_ROWS_XPATH(table):
+        cells = CELLS_XPATH(tr)
+        # Skip repeated header rows (class="thead") and spacer/partial rows that don't span the full width
+        if 'thead' in tr.get('class', '').split() or len(cells) != len(headers):
+            continue
+        for name, column in MATCH_LOG_COLUMNS.items():
+            data[column].append(_cell_text(cells[positions[name]]) or None)
+    return pd.DataFrame(data)
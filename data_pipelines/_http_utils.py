@@ -0,0 +1,97 @@
+import hashlib
+import json
+import logging
+import os
+import random
+import threading
+import time
+import httpx
+
+USER_AGENT = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/94.0.4606.81 Safari/537.36"
+
+class NotModified(Exception):
+    """Raised when a conditional fetch finds the page unchanged since the last run."""
+
+class RateLimiter:
+    """Spaces request start times evenly across every thread sharing the limiter."""
+
+    def __init__(self, rate: float):
+        self.interval = 1.0 / rate
+        self.next_slot = time.monotonic()
+        self.lock = threading.Lock()
+
+    def wait(self) -> None:
+        with self.lock:
+            now = time.monotonic()
+            slot = max(self.next_slot, now)
+            self.next_slot = slot + self.interval
+        time.sleep(max(0.0, slot - now))
+
+def create_http_client(user_agent: str = USER_AGENT) -> httpx.Client:
+    """Builds the HTTP/2 client shared by every static fetch in a run."""
+    return httpx.Client(http2=True, headers={"User-Agent": user_agent}, timeout=30, follow_redirects=True)
+
+def backoff_delay(error: Exception, attempt: int, base: float = 1) -> float:
+    """Seconds to wait before retrying: the server's Retry-After if it sent one, else exponential with jitter."""
+    if isinstance(error, httpx.HTTPStatusError):
+        try:
+            return float(error.response.headers['Retry-After'])
+        except (KeyError, ValueError):
+            pass
+    return base * 2 ** attempt + random.random()
+
+def fetch_static(client: httpx.Client, url: str, retries: int = 3, delay: float = 5, validators: dict | None = None,
+                 limiter=None, strip_comments: bool = True) -> tuple[str | None, dict]:
+    """
+    Fetches a server-rendered page over plain HTTP, without a browser, retrying failures with backoff.
+    FBREF hides some tables inside HTML comments, so the comment markers are stripped unless
+    `strip_comments` is off. Each attempt first waits on `limiter`, if one is shared between workers.
+    With `validators` saved from an earlier fetch the GET is conditional, and NotModified is raised
+    on a 304 or when the body hashes the same as before. Returns the page text and the validators
+    (ETag, Last-Modified, SHA-256 of the body) to store for the next run, or (None, {}) on failure.
+    """
+    headers = {}
+    if validators and validators.get('etag'):
+        headers['If-None-Match'] = validators['etag']
+    if validators and validators.get('last_modified'):
+        headers['If-Modified-Since'] = validators['last_modified']
+
+    for attempt in range(retries):
+        if limiter:
+            limiter.wait()
+        try:
+            response = client.get(url, headers=headers)
+            if response.status_code == 304:
+                raise NotModified(url)
+            response.raise_for_status()
+            break
+        except httpx.HTTPError as e:
+            logging.warning(f"Static fetch attempt {attempt + 1} failed for {url}: {e}")
+            if attempt < retries - 1:
+                time.sleep(backoff_delay(e, attempt, delay))
+    else:
+        return None, {}
+    digest = hashlib.sha256(response.content).hexdigest()
+    if validators and validators.get('sha256') == digest:
+        raise NotModified(url)
+    new_validators = {
+        'etag': response.headers.get('ETag'),
+        'last_modified': response.headers.get('Last-Modified'),
+        'sha256': digest,
+    }
+    text = response.text
+    if strip_comments:
+        text = text.replace('<!--', '').replace('-->', '')
+    return text, new_validators
+
+def load_etag_cache(path: str) -> dict:
+    """Loads the URL -> validators map written by the previous run, if there is one."""
+    if not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        return json.load(f)
+
+def save_etag_cache(path: str, etags: dict) -> None:
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'w') as f:
+        json.dump(etags, f, indent=2, sort_keys=True)
@@ -0,0 +1,109 @@
+import functools
+import logging
+import os
+import threading
+from selenium import webdriver
+from selenium.common.exceptions import TimeoutException
+from selenium.webdriver.chrome.service import Service as ChromeService
+from selenium.webdriver.chrome.options import Options
+from selenium.webdriver.common.by import By
+from selenium.webdriver.support.ui import WebDriverWait
+from selenium.webdriver.support import expected_conditions as EC
+from webdriver_manager.chrome import ChromeDriverManager
+
+DEFAULT_CHROME_BINARY = "C:\\Program Files\\Google\\Chrome\\Application\\chrome.exe"
+USER_AGENT = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/94.0.4606.81 Safari/537.36"
+BLOCKED_CONTENT_PREFS = {
+    "profile.managed_default_content_settings.images": 2,
+    "profile.managed_default_content_settings.stylesheets": 2,
+    "profile.managed_default_content_settings.fonts": 2,
+}
+
+# Serializes the first chromedriver install when several fetchers launch at once
+_DRIVER_PATH_LOCK = threading.Lock()
+
+@functools.lru_cache(maxsize=1)
+def _cached_driver_path() -> str:
+    return ChromeDriverManager().install()
+
+def driver_path() -> str:
+    """Installs (or validates) the matching chromedriver once per process and returns its path."""
+    with _DRIVER_PATH_LOCK:
+        return _cached_driver_path()
+
+class SeleniumFetcher:
+    """
+    Fetches the full HTML content of pages using Selenium with maximum stealth options.
+    One Chrome instance is launched on first use and reused for every URL until the
+    fetcher is closed, instead of starting a fresh browser per page.
+    Each fetch waits until the `wait_for` (By, selector) locator is present and the document
+    has finished loading.
+    """
+
+    def __init__(self, wait_for: tuple[str, str] = (By.CSS_SELECTOR, "table.stats_table"),
+                 binary_location: str | None = DEFAULT_CHROME_BINARY):
+        self.wait_for = wait_for
+        self.binary_location = binary_location
+        self.driver = None
+
+    def __enter__(self) -> "SeleniumFetcher":
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        self.close()
+
+    def _start_driver(self) -> webdriver.Chrome:
+        options = Options()
+        if self.binary_location and os.path.exists(self.binary_location):
+            options.binary_location = self.binary_location
+
+        # --- MAXIMUM STEALTH PROTOCOL ---
+        options.add_argument("--headless")
+        options.add_argument("--no-sandbox")
+        options.add_argument("--disable-dev-shm-usage")
+        options.add_argument("--disable-gpu")
+        options.add_argument("--window-size=1920,1200")
+        options.add_argument(f"user-agent={USER_AGENT}")
+
+        options.add_argument('--disable-blink-features=AutomationControlled')
+        options.add_experimental_option("excludeSwitches", ["enable-automation", "enable-logging"])
+        options.add_experimental_option('useAutomationExtension', False)
+
+        # --- LIGHTWEIGHT PAGE LOADS ---
+        # Only the HTML tables are scraped, so images, stylesheets and fonts are never downloaded,
+        # and driver.get returns once the DOM is interactive instead of after every subresource
+        options.add_experimental_option("prefs", BLOCKED_CONTENT_PREFS)
+        options.page_load_strategy = 'eager'
+
+        service = ChromeService(driver_path())
+        driver = webdriver.Chrome(service=service, options=options)
+        driver.execute_script("Object.defineProperty(navigator, 'webdriver', {get: () => undefined})")
+        return driver
+
+    def fetch(self, url: str) -> str | None:
+        """Loads a page in the shared browser and returns its rendered HTML."""
+        try:
+            if self.driver is None:
+                self.driver = self._start_driver()
+            else:
+                # A reused browser would otherwise carry the previous page's session into this one,
+                # which a fresh browser per page never did
+                self.driver.delete_all_cookies()
+            self.driver.get(url)
+            WebDriverWait(self.driver, 20).until(EC.presence_of_element_located(self.wait_for))
+            # Returns as soon as the page reports it has loaded, rather than sleeping a fixed few seconds
+            try:
+                WebDriverWait(self.driver, 5).until(lambda d: d.execute_script("return document.readyState") == "complete")
+            except TimeoutException:
+                logging.warning(f"Page did not finish loading for URL {url}; using the HTML rendered so far.")
+            return self.driver.page_source
+        except Exception as e:
+            logging.error(f"Selenium error for URL {url}: {e}")
+            # Relaunch on the next fetch in case the browser itself is what failed
+            self.close()
+            return None
+
+    def close(self) -> None:
+        if self.driver:
+            self.driver.quit()
+            self.driver = None
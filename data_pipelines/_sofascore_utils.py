@@ -0,0 +1,15 @@
+import logging
+import httpx
+
+SOFASCORE_SEARCH_API = "https://api.sofascore.com/api/v1/search/all"
+SEARCH_PAGE_TEMPLATE = "https://www.sofascore.com/search/results?q={query}"
+
+def search_api(client: httpx.Client, query: str) -> list:
+    """Returns the results of SofaScore's JSON search endpoint for query, or [] if the call fails."""
+    try:
+        response = client.get(SOFASCORE_SEARCH_API, params={"q": query})
+        response.raise_for_status()
+        return response.json().get('results', [])
+    except (httpx.HTTPError, ValueError) as e:
+        logging.warning(f"Search API call failed for '{query}': {e}")
+        return []
@@ -0,0 +1,30 @@
+import argparse
+import importlib
+
+# The step scripts are named after their position in the pipeline, so they're loaded by name
+model_data_prep = importlib.import_module("04_model_data_prep")
+train_model = importlib.import_module("05_train_model")
+
+
+def main(model_output_dir: str, model_name: str, max_iter: int, log_level: str, save_intermediate: bool = False) -> None:
+    """
+    Runs model preparation (04) and training (05) in one process.
+    The prepared splits are handed to training in memory, so only the trained model and its
+    feature-column JSON are written, unless save_intermediate asks for model_data/ as well.
+    """
+    data = model_data_prep.main(save=save_intermediate)
+    if data is None:
+        return
+    train_model.main("model_data", model_output_dir, model_name, max_iter, log_level, data=data)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Prepare data and train the FPL Oracle model in one run.")
+    parser.add_argument("--model-output-dir", type=str, default="trained_models", help="Directory to save the trained model.")
+    parser.add_argument("--model-name", type=str, default="fpl_oracle_model.joblib", help="Name of the model file.")
+    parser.add_argument("--max-iter", type=int, default=300, help="Maximum number of boosting iterations.")
+    parser.add_argument("--save-intermediate", action="store_true", help="Also write the X/y splits to model_data/ for debugging.")
+    parser.add_argument("--log-level", type=str, default="INFO", choices=["DEBUG", "INFO", "WARNING", "ERROR"], help="Logging level.")
+
+    args = parser.parse_args()
+    main(args.model_output_dir, args.model_name, args.max_iter, args.log_level, args.save_intermediate)
@@ -1,40 +1,39 @@
 import pandas as pd
+import numpy as np
 from sklearn.model_selection import train_test_split
 import os
 
-def calculate_fantasy_points(row):
+# FPL points per goal by position
+GOAL_MULTIPLIER = {'FWD': 4, 'MID': 5, 'DEF': 6, 'GK': 6}
+
+def calculate_fantasy_points(df: pd.DataFrame) -> np.ndarray:
     """
     Calculates a proxy for FPL points based on available FBREF stats.
     This is a simplified model and can be expanded.
+    Operates on whole columns at once rather than row by row.
     """
-    points = 0
-    
-    # Points for playing
-    if row['Min'] > 0:
-        points += 1
-    if row['Min'] >= 60:
-        points += 1 # An additional point for 60+ minutes
-        
-    # Points for goals, varying by position
-    if row['Position'] == 'FWD':
-        points += row['Gls'] * 4
-    elif row['Position'] == 'MID':
-        points += row['Gls'] * 5
-    elif row['Position'] == 'DEF':
-        points += row['Gls'] * 6
-    else: # Goalkeepers
-        points += row['Gls'] * 6
+    minutes = df['Min'].to_numpy()
+
+    # Points for playing (an additional point for 60+ minutes), as one small int8 array
+    appearance = np.where(minutes >= 60, 2, np.where(minutes > 0, 1, 0)).astype(np.int8)
+
+    # Points for goals, varying by position. On a categorical Position the map runs once per
+    # category rather than per row; anything unlisted scores like a defender.
+    goal_multiplier = df['Position'].map(GOAL_MULTIPLIER).fillna(6).to_numpy(dtype=np.int8)
+    # The goals term is a fresh array, so the remaining terms accumulate into it in place
+    points = df['Gls'].to_numpy(dtype=np.float64) * goal_multiplier
+    points += appearance
 
     # Points for assists
-    points += row['Ast'] * 3
-    
+    points += df['Ast'].to_numpy() * 3
+
     # Negative points for cards
-    points -= row['CrdY'] * 1
-    points -= row['CrdR'] * 3
-    
+    points -= df['CrdY'].to_numpy()
+    points -= df['CrdR'].to_numpy() * 3
+
     # Note: Clean sheets, bonus points, saves, etc., are not included
     # as they are not directly available in this FBREF dataset.
-    
+
     return points
 
 def main():
@@ -42,7 +41,7 @@ def main():
     
     # --- Configuration ---
     PROCESSED_DATA_DIR = "processed_data"
-    INPUT_FILE = "master_player_stats_v3_features.csv"
+    INPUT_FILE = "master_player_stats_v3_features.parquet"
     
     input_path = os.path.join(PROCESSED_DATA_DIR, INPUT_FILE)
 
@@ -51,14 +50,16 @@ def main():
         print(f"Error: Input file not found at {input_path}")
         return
     print(f"Reading feature-engineered data from {input_path}...")
-    df = pd.read_csv(input_path)
+    df = pd.read_parquet(input_path)
     
     # --- 1. Define the Target Variable ---
     # Drop players with very few minutes as they add noise
     df = df[df['Min'] > 90].copy()
+    # A handful of distinct positions: categorical keeps lookups and one-hot encoding cheap
+    df['Position'] = df['Position'].astype('category')
     print(f"Filtered down to {len(df)} players with more than 90 minutes played.")
     
-    df['FantasyPoints'] = df.apply(calculate_fantasy_points, axis=1)
+    df['FantasyPoints'] = calculate_fantasy_points(df)
     print("Calculated 'FantasyPoints' target variable.")
 
     # --- 2. Feature Selection ---
@@ -83,7 +84,8 @@ def main():
     
     # --- 3. One-Hot Encoding for Categorical Data ---
     categorical_features = ['Squad', 'Position']
-    model_df = pd.get_dummies(model_df, columns=categorical_features, drop_first=True)
+    # int8 dummies: one byte per 0/1 flag, numeric as written to disk and fed to the model
+    model_df = pd.get_dummies(model_df, columns=categorical_features, drop_first=True, dtype=np.int8)
     print("Applied one-hot encoding to categorical features.")
 
     # --- 4. Train-Test Split ---
@@ -98,10 +100,10 @@ def main():
     MODEL_DATA_DIR = "model_data"
     os.makedirs(MODEL_DATA_DIR, exist_ok=True)
     
-    X_train.to_csv(os.path.join(MODEL_DATA_DIR, "X_train.csv"), index=False)
-    X_test.to_csv(os.path.join(MODEL_DATA_DIR, "X_test.csv"), index=False)
-    y_train.to_csv(os.path.join(MODEL_DATA_DIR, "y_train.csv"), index=False)
-    y_test.to_csv(os.path.join(MODEL_DATA_DIR, "y_test.csv"), index=False)
+    X_train.to_parquet(os.path.join(MODEL_DATA_DIR, "X_train.parquet"), engine='pyarrow', compression='zstd', index=False)
+    X_test.to_parquet(os.path.join(MODEL_DATA_DIR, "X_test.parquet"), engine='pyarrow', compression='zstd', index=False)
+    y_train.to_frame().to_parquet(os.path.join(MODEL_DATA_DIR, "y_train.parquet"), engine='pyarrow', compression='zstd', index=False)
+    y_test.to_frame().to_parquet(os.path.join(MODEL_DATA_DIR, "y_test.parquet"), engine='pyarrow', compression='zstd', index=False)
     
     print(f"\n--- Model Preparation Complete ---")
     print(f"Prepared data saved to the '{MODEL_DATA_DIR}' directory.")
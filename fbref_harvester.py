@@ -1,16 +1,10 @@
-import time
-import random
 import pandas as pd
-from selenium import webdriver
-from selenium.webdriver.chrome.options import Options
-from selenium.webdriver.chrome.service import Service
-from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
-from selenium.common.exceptions import TimeoutException, NoSuchElementException
-from webdriver_manager.chrome import ChromeDriverManager
 import logging
-import functools
+from concurrent.futures import ThreadPoolExecutor
+import os
+import lxml.html
+from data_pipelines._fbref_tables import table_to_dataframe
+from data_pipelines._http_utils import NotModified, RateLimiter, create_http_client, fetch_static, load_etag_cache, save_etag_cache
 
 # Configure logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
@@ -20,43 +14,13 @@ SEASONS = ["2023-2024", "2024-2025"]  # Add more seasons as needed
 BASE_URL = "https://fbref.com/en/comps/9"
 PLAYER_STATS_URL = f"{BASE_URL}/stats/Premier-League-Stats"
 OUTPUT_DIR = "fbref_data"
+ETAG_CACHE_FILE = "cache/fbref_etags.json"  # URL -> ETag / Last-Modified / body hash from earlier runs
+REQUESTS_PER_MINUTE = 10  # FBREF's published limit for automated requests; going over it blocks the client
+MAX_RETRIES = 5
+MAX_WORKERS = 4  # Pages scraped at once; the shared limiter still caps the request rate
 
-def setup_driver():
-    """Setup Selenium WebDriver with Ghost Protocol configuration."""
-    chrome_options = Options()
-    chrome_options.add_argument("--headless")  # Run in headless mode
-    chrome_options.add_argument("--no-sandbox")
-    chrome_options.add_argument("--disable-dev-shm-usage")
-    chrome_options.add_argument("--disable-blink-features=AutomationControlled")
-    chrome_options.add_experimental_option("excludeSwitches", ["enable-automation"])
-    chrome_options.add_experimental_option('useAutomationExtension', False)
-    chrome_options.add_argument("--user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36")
-
-    service = Service(ChromeDriverManager().install())
-    driver = webdriver.Chrome(service=service, options=chrome_options)
-    driver.execute_script("Object.defineProperty(navigator, 'webdriver', {get: () => undefined})")
-    return driver
-
-def random_delay(min_delay=1, max_delay=3):
-    """Add random delay to mimic human behavior."""
-    time.sleep(random.uniform(min_delay, max_delay))
-
-def retry_on_failure(max_retries=3, delay=5):
-    """Decorator to retry function on failure."""
-    def decorator(func):
-        @functools.wraps(func)
-        def wrapper(*args, **kwargs):
-            for attempt in range(max_retries):
-                try:
-                    return func(*args, **kwargs)
-                except Exception as e:
-                    logging.warning(f"Attempt {attempt + 1} failed: {e}")
-                    if attempt < max_retries - 1:
-                        time.sleep(delay)
-                    else:
-                        raise
-        return wrapper
-    return decorator
+# Every FBREF request in this process goes through one limiter, instead of fixed sleeps between pages
+LIMITER = RateLimiter(REQUESTS_PER_MINUTE / 60)
 
 def get_season_url(season):
     """Get the URL for a specific season's player stats."""
@@ -64,13 +28,20 @@ def get_season_url(season):
     # FBREF URLs for historical seasons: https://fbref.com/en/comps/9/2023-2024/stats/2023-2024-Premier-League-Stats
     return f"{BASE_URL}/{season}/stats/{season}-Premier-League-Stats"
 
-@retry_on_failure()
-def scrape_player_stats(driver, season):
-    """Scrape all player stats tables for a season."""
+def get_fixtures_url(season):
+    """Get the URL for a specific season's fixtures."""
+    return f"{BASE_URL}/{season}/schedule/{season}-Premier-League-Scores-and-Fixtures"
+
+def scrape_player_stats(client, season, validators=None):
+    """Scrape all player stats tables for a season. Returns the merged table and the page's validators."""
     url = get_season_url(season)
     logging.info(f"Scraping player stats for {season} from {url}")
-    driver.get(url)
-    random_delay()
+    # FBREF serves these tables in the initial HTML, so no browser is needed to render them
+    html_content, new_validators = fetch_static(client, url, MAX_RETRIES, delay=1, validators=validators, limiter=LIMITER)
+    if not html_content:
+        logging.error(f"Could not fetch {url}")
+        return pd.DataFrame(), {}
+    page = lxml.html.fromstring(html_content)
 
     tables_data = {}
 
@@ -86,13 +57,8 @@ def scrape_player_stats(driver, season):
 
     for table_name, table_id in table_ids.items():
         try:
-            # Some tables might be in tabs, need to click
-            # For simplicity, assume direct access, but in reality, might need to handle tabs
-            table_element = WebDriverWait(driver, 10).until(
-                EC.presence_of_element_located((By.ID, table_id))
-            )
-            table_html = table_element.get_attribute('outerHTML')
-            df = pd.read_html(table_html)[0]
+            # Tables FBREF ships inside HTML comments are already uncommented by fetch_static
+            df = table_to_dataframe(page.get_element_by_id(table_id), flat=True)
             tables_data[table_name] = clean_table(df)
             logging.info(f"Scraped {table_name} table")
         except Exception as e:
@@ -101,8 +67,8 @@ def scrape_player_stats(driver, season):
     # Merge all tables on player name or something
     if tables_data:
         merged_df = merge_player_tables(tables_data)
-        return merged_df
-    return pd.DataFrame()
+        return merged_df, new_validators
+    return pd.DataFrame(), new_validators
 
 def clean_table(df):
     """Clean a single table: handle headers, remove junk rows."""
@@ -113,39 +79,51 @@ def clean_table(df):
     # Remove rows that are repeated headers
     df = df[~df.iloc[:, 0].str.contains('Rk|Player', na=False, case=False)]
     # Ensure numeric columns are numeric
-    for col in df.columns:
-        if col != 'Player':  # Assuming 'Player' is the name column
-            df[col] = pd.to_numeric(df[col], errors='coerce')
+    num_cols = [col for col in df.columns if col != 'Player']  # Assuming 'Player' is the name column
+    # Cells arrive as text, so thousands separators ('1,100' minutes) are dropped before conversion
+    df[num_cols] = df[num_cols].apply(lambda col: pd.to_numeric(col.str.replace(',', '', regex=False), errors='coerce'))
     return df
 
 def merge_player_tables(tables):
-    """Merge all player stat tables into one."""
-    base_df = tables['Standard']
-    for name, df in tables.items():
+    """
+    Merge all player stat tables into one, keeping the Standard table's rows, in one concat.
+    Columns another table already supplied get that table's suffix ('Gls_shooting').
+    """
+    seen = set()
+    frames = []
+    for name in ['Standard'] + [name for name in tables if name != 'Standard']:
+        df = tables[name]
         if name != 'Standard':
-            # Merge on 'Player' column, assuming it exists
-            base_df = base_df.merge(df, on='Player', how='left', suffixes=('', f'_{name.lower()}'))
-    return base_df
-
-@retry_on_failure()
-def scrape_fixtures(driver, season):
-    """Scrape fixtures for a season."""
-    url = f"{BASE_URL}/{season}/schedule/{season}-Premier-League-Scores-and-Fixtures"
+            df = df.rename(columns={col: f'{col}_{name.lower()}' for col in df.columns if col in seen and col != 'Player'})
+        seen.update(df.columns)
+        # Players who changed clubs appear once per club, so repeats are numbered to align
+        # the n-th row of a player across tables
+        occurrence = df.groupby('Player', dropna=False).cumcount().rename('_occurrence')
+        frames.append(df.set_index(['Player', occurrence]))
+
+    merged, others = frames[0], frames[1:]
+    # Only the other tables are aligned to Standard's rows, so Standard's own columns keep their dtypes
+    if others:
+        merged = pd.concat([merged, pd.concat(others, axis=1, join='outer').reindex(merged.index)], axis=1)
+    return merged.reset_index(level='_occurrence', drop=True).reset_index()
+
+def scrape_fixtures(client, season, validators=None):
+    """Scrape fixtures for a season. Returns the table and the page's validators."""
+    url = get_fixtures_url(season)
     logging.info(f"Scraping fixtures for {season} from {url}")
-    driver.get(url)
-    random_delay()
+    html_content, new_validators = fetch_static(client, url, MAX_RETRIES, delay=1, validators=validators, limiter=LIMITER)
+    if not html_content:
+        logging.error(f"Could not fetch {url}")
+        return pd.DataFrame(), {}
 
     try:
-        table_element = WebDriverWait(driver, 10).until(
-            EC.presence_of_element_located((By.ID, 'sched_all'))  # Assuming the table ID
-        )
-        table_html = table_element.get_attribute('outerHTML')
-        df = pd.read_html(table_html)[0]
+        table_element = lxml.html.fromstring(html_content).get_element_by_id('sched_all')  # Assuming the table ID
+        df = table_to_dataframe(table_element, flat=True)
         df = clean_fixtures_table(df)
-        return df
+        return df, new_validators
     except Exception as e:
         logging.error(f"Failed to scrape fixtures: {e}")
-        return pd.DataFrame()
+        return pd.DataFrame(), {}
 
 def clean_fixtures_table(df):
     """Clean fixtures table."""
@@ -156,31 +134,53 @@ def clean_fixtures_table(df):
     df = df.dropna(subset=['Date'])  # Assuming 'Date' column exists
     return df
 
-def save_to_csv(df, filename):
-    """Save DataFrame to CSV."""
-    import os
-    os.makedirs(OUTPUT_DIR, exist_ok=True)
-    path = os.path.join(OUTPUT_DIR, filename)
-    df.to_csv(path, index=False)
-    logging.info(f"Saved {filename}")
+def season_path(dataset, season):
+    """Path of one season's partition in a Hive-style dataset, e.g. fbref_data/fixtures/season=2024-2025/."""
+    return os.path.join(OUTPUT_DIR, dataset, f"season={season}", f"{dataset}.parquet")
+
+def save_to_parquet(df, path):
+    """Save DataFrame to Parquet."""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    df.to_parquet(path, engine='pyarrow', compression='zstd', index=False)
+    logging.info(f"Saved {path}")
+
+def scrape_and_save(scrape, client, etags, url, season, dataset):
+    """
+    Run one scraper for a season and save its table as that season's partition of `dataset`.
+    A table that's already on disk is re-fetched conditionally and left alone if the page
+    hasn't changed since the last run.
+    """
+    path = season_path(dataset, season)
+    validators = etags.get(url) if os.path.exists(path) else None
+    try:
+        df, new_validators = scrape(client, season, validators)
+    except NotModified:
+        logging.info(f"{dataset} for {season} is unchanged since the last run. Skipping.")
+        return
+    if not df.empty:
+        save_to_parquet(df, path)
+        # Only remembered once the table is saved, so a failed run never masks a change
+        if new_validators:
+            etags[url] = new_validators
 
 def main():
-    driver = setup_driver()
+    etags = load_etag_cache(ETAG_CACHE_FILE)
+    # One task per page: each season's player stats and fixtures. Every task writes its own partition
+    # and owns its URL's validators, so workers share nothing but the client and the rate limiter.
+    # Seasons live in the partition path (season=.../), so each dataset reads back in one scan.
+    tasks = []
+    for season in SEASONS:
+        tasks.append((scrape_player_stats, get_season_url(season), season, "player_stats"))
+        tasks.append((scrape_fixtures, get_fixtures_url(season), season, "fixtures"))
+
     try:
-        for season in SEASONS:
-            # Scrape player stats
-            player_df = scrape_player_stats(driver, season)
-            if not player_df.empty:
-                save_to_csv(player_df, f"fbref_player_stats_{season}.csv")
-
-            # Scrape fixtures
-            fixtures_df = scrape_fixtures(driver, season)
-            if not fixtures_df.empty:
-                save_to_csv(fixtures_df, f"fbref_fixtures_{season}.csv")
-
-            random_delay(5, 10)  # Longer delay between seasons
+        with create_http_client() as client, ThreadPoolExecutor(max_workers=MAX_WORKERS) as pool:
+            futures = [pool.submit(scrape_and_save, scrape, client, etags, url, season, dataset)
+                       for scrape, url, season, dataset in tasks]
+            for future in futures:
+                future.result()
     finally:
-        driver.quit()
+        save_etag_cache(ETAG_CACHE_FILE, etags)
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
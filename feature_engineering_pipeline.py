@@ -2,16 +2,6 @@ import pandas as pd
 import numpy as np
 import os
 
-def assign_position(pos_str: str) -> str:
-    """Assigns a general position based on the detailed Pos string from FBREF."""
-    if 'FW' in pos_str:
-        return 'FWD'
-    if 'MF' in pos_str:
-        return 'MID'
-    if 'DF' in pos_str:
-        return 'DEF'
-    return 'GK' # Assuming if none of the above, it's a Goalkeeper
-
 def create_features(df: pd.DataFrame) -> pd.DataFrame:
     """
     Takes the cleaned master dataframe and engineers new predictive features.
@@ -20,28 +10,24 @@ def create_features(df: pd.DataFrame) -> pd.DataFrame:
     numeric_cols = ['Min', '90s', 'Gls', 'Ast', 'xG', 'npxG', 'xAG', 'SCA', 'GCA', 'Touches'] 
     # Find which of these columns actually exist in the dataframe to avoid KeyErrors
     cols_to_convert = [col for col in numeric_cols if col in df.columns]
-    for col in cols_to_convert:
-        df[col] = pd.to_numeric(df[col], errors='coerce')
-
-    # Fill any resulting NaNs in these columns with 0
-    df[cols_to_convert] = df[cols_to_convert].fillna(0)
+    # Converted and filled in one assignment, so NaNs from coercion become 0 as well
+    df[cols_to_convert] = df[cols_to_convert].apply(pd.to_numeric, errors='coerce').fillna(0)
 
     # --- Feature Engineering ---
     
     # 1. Per 90 Metrics (handle division by zero)
-    df['Min'] = df['Min'].replace(0, np.nan) # Avoid division by zero, temporarily
-    df['90s'] = df['Min'] / 90
-    df['90s'] = df['90s'].fillna(0) # Put zeros back
+    # Players with no minutes get 0 for every per-90 rate instead of dividing by zero
+    nineties = df['Min'].to_numpy(dtype=np.float64) / 90
+    played = nineties > 0
+    safe_nineties = np.where(played, nineties, 1.0)
+    df['90s'] = nineties
 
-    if 'xG' in df.columns:
-        df['xG_p90'] = (df['xG'] / df['90s']).fillna(0)
-    if 'xAG' in df.columns:
-        df['xAG_p90'] = (df['xAG'] / df['90s']).fillna(0)
-    if 'SCA' in df.columns:
-        df['SCA_p90'] = (df['SCA'] / df['90s']).fillna(0)
-    if 'Touches' in df.columns: # Assuming a general 'Touches' column exists
-        # In the future we would use 'Touches (Att Pen)' specifically if scraped
-        df['Touches_p90'] = (df['Touches'] / df['90s']).fillna(0)
+    # All rates come from one 2-D division; a general 'Touches' column is assumed for now
+    # (in the future we would use 'Touches (Att Pen)' specifically if scraped)
+    p90_cols = [col for col in ['xG', 'xAG', 'SCA', 'Touches'] if col in df.columns]
+    if p90_cols:
+        rates = df[p90_cols].to_numpy(dtype=np.float64) / safe_nineties[:, None]
+        df[[f'{col}_p90' for col in p90_cols]] = np.where(played[:, None], rates, 0)
 
     # 2. Efficiency & Conversion Ratios
     if 'Gls' in df.columns and 'xG' in df.columns:
@@ -51,7 +37,13 @@ def create_features(df: pd.DataFrame) -> pd.DataFrame:
 
     # 3. Positional Grouping
     if 'Pos' in df.columns:
-        df['Position'] = df['Pos'].apply(assign_position)
+        # First matching code wins (e.g. 'MF,FW' is a forward); anything else, missing included, is a keeper
+        pos = df['Pos'].fillna('')
+        df['Position'] = np.select(
+            [pos.str.contains('FW', na=False), pos.str.contains('MF', na=False), pos.str.contains('DF', na=False)],
+            ['FWD', 'MID', 'DEF'],
+            default='GK',
+        )
 
     # Clean up infinite values that might result from division by zero
     df.replace([np.inf, -np.inf], 0, inplace=True)
@@ -62,8 +54,9 @@ def main():
     """Main execution function."""
     # --- Configuration ---
     PROCESSED_DATA_DIR = "processed_data"
-    INPUT_FILE = "master_player_stats_v2.csv"
-    OUTPUT_FILE = "master_player_stats_v3_features.csv"
+    INPUT_FILE = "master_player_stats_v2.parquet" # Written by data_cleaner.py
+    OUTPUT_FILE = "master_player_stats_v3_features.parquet" # Read by data_preparation.py
+    OUTPUT_CSV_FILE = "master_player_stats_v3_features.csv" # Human-readable copy
     
     input_path = os.path.join(PROCESSED_DATA_DIR, INPUT_FILE)
     output_path = os.path.join(PROCESSED_DATA_DIR, OUTPUT_FILE)
@@ -74,12 +67,13 @@ def main():
         return
 
     print(f"Reading cleaned data from {input_path}...")
-    master_df = pd.read_csv(input_path)
+    master_df = pd.read_parquet(input_path)
 
     print("Engineering new features...")
     featured_df = create_features(master_df)
 
-    featured_df.to_csv(output_path, index=False)
+    featured_df.to_parquet(output_path, engine='pyarrow', compression='zstd', index=False)
+    featured_df.to_csv(os.path.join(PROCESSED_DATA_DIR, OUTPUT_CSV_FILE), index=False)
     print(f"\n--- Feature Engineering Complete ---")
     print(f"Enriched dataset created with {len(featured_df.columns)} columns.")
     print(f"File saved to: {output_path}")
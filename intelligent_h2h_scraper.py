@@ -1,3 +1,7 @@
+import base64
+import functools
+import json
+import httpx
 import pandas as pd
 from bs4 import BeautifulSoup
 import os
@@ -8,14 +12,20 @@ from selenium.webdriver.chrome.options import Options
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
-from webdriver_manager.chrome import ChromeDriverManager
 from io import StringIO
 import logging
-import random
+import queue
+from concurrent.futures import ThreadPoolExecutor
 from config import *
+from data_pipelines._selenium_utils import driver_path
+from data_pipelines._http_utils import NotModified, RateLimiter, create_http_client, fetch_static, load_etag_cache, save_etag_cache
 
-def get_html_with_selenium(url: str) -> str | None:
-    """Fetches the full HTML content of a page using Selenium with Ghost Protocol stealth options."""
+# Every FBREF request, static or through a browser, goes through one limiter shared by all workers
+LIMITER = RateLimiter(REQUESTS_PER_MINUTE / 60)
+
+@functools.lru_cache(maxsize=1)
+def _chrome_options() -> Options:
+    """Builds the Ghost Protocol Chrome options once per process; every fetch launches with the same set."""
     options = Options()
 
     # Set Chrome binary if configured and exists
@@ -37,33 +47,139 @@ def get_html_with_selenium(url: str) -> str | None:
     options.add_experimental_option("excludeSwitches", ["enable-automation", "enable-logging"])
     options.add_experimental_option('useAutomationExtension', False)
 
-    driver = None
+    # Only the match-log table is needed: skip images, stylesheets and fonts, and stop waiting
+    # on subresources once the DOM is interactive
+    options.add_experimental_option("prefs", {
+        "profile.managed_default_content_settings.images": 2,
+        "profile.managed_default_content_settings.stylesheets": 2,
+        "profile.managed_default_content_settings.fonts": 2,
+    })
+    options.page_load_strategy = 'eager'
+
+    # Network events are logged so the page's raw HTML can be read back over CDP
+    options.set_capability('goog:loggingPrefs', {'performance': 'ALL'})
+    return options
+
+def create_driver() -> webdriver.Chrome:
+    """Launches a Chrome instance with Ghost Protocol stealth options, to be reused for many pages."""
+    # Driver path is resolved once per process rather than re-validated on every launch
+    service = ChromeService(driver_path())
+    driver = webdriver.Chrome(service=service, options=_chrome_options())
+    # A page stuck on a slow resource fails fast instead of holding a worker's browser
+    driver.set_page_load_timeout(15)
+
+    # Execute script to hide webdriver property
+    driver.execute_script("Object.defineProperty(navigator, 'webdriver', {get: () => undefined})")
+    return driver
+
+def document_response_body(driver: webdriver.Chrome) -> str | None:
+    """
+    Returns the raw HTML the server sent for the page now loaded in the main frame, read over CDP
+    from the performance log, or None if it can't be found.
+    """
+    main_frame = driver.execute_cdp_cmd('Page.getFrameTree', {})['frameTree']['frame']['id']
+    request_id = None
+    for entry in driver.get_log('performance'):
+        message = json.loads(entry['message'])['message']
+        params = message.get('params', {})
+        # The last document response wins, so redirects and bot challenges resolve to the final page
+        if (message.get('method') == 'Network.responseReceived' and params.get('type') == 'Document'
+                and params.get('frameId') == main_frame):
+            request_id = params['requestId']
+    if request_id is None:
+        return None
     try:
-        service = ChromeService(ChromeDriverManager().install())
-        driver = webdriver.Chrome(service=service, options=options)
-
-        # Execute script to hide webdriver property
-        driver.execute_script("Object.defineProperty(navigator, 'webdriver', {get: () => undefined})")
-
+        response = driver.execute_cdp_cmd('Network.getResponseBody', {'requestId': request_id})
+    except Exception:
+        return None
+    body = response['body']
+    if response.get('base64Encoded'):
+        body = base64.b64decode(body).decode('utf-8', errors='replace')
+    return body.replace('<!--', '').replace('-->', '')
+
+def get_html_with_selenium(driver: webdriver.Chrome, url: str) -> str | None:
+    """
+    Fetches the HTML content of a page in an already running browser. The raw response is used
+    when it already holds the match log, which skips serializing the DOM; otherwise the rendered
+    page source is returned.
+    """
+    try:
+        # A fresh browser per page never carried cookies over, so a reused one doesn't either
+        driver.delete_all_cookies()
+        # Drop network events left over from the previous page
+        driver.get_log('performance')
         driver.get(url)
         WebDriverWait(driver, 20).until(EC.presence_of_element_located((By.ID, "matchlogs_for")))
         time.sleep(3)  # Patient sleep after page load
+        body = document_response_body(driver)
+        if body and 'matchlogs_for' in body:
+            return body
         return driver.page_source
     except Exception as e:
         logging.error(f"Selenium error for URL {url}: {e}")
         return None
+
+def fetch_with_pool(drivers: queue.Queue, url: str) -> str | None:
+    """Fetches a page with a browser checked out of the pool, launching it on first use."""
+    driver = drivers.get()
+    try:
+        if driver is None:
+            driver = create_driver()
+        LIMITER.wait()
+        return get_html_with_selenium(driver, url)
+    except Exception as e:
+        logging.error(f"Could not launch Chrome for URL {url}: {e}")
+        return None
     finally:
-        if driver:
-            driver.quit()
+        drivers.put(driver)
+
+def scrape_team_season(client: httpx.Client, drivers: queue.Queue, etags: dict, team_name: str, season: str, url: str) -> None:
+    """
+    Fetches one team's match-log page for one season, over HTTP first and Selenium only as a fallback.
+    A page fetched on an earlier run is re-requested conditionally and read back from the HTML cache
+    if FBREF reports it unchanged.
+    """
+    logging.info(f"Scraping H2H data for: {team_name} from {url}")
+    cache_path = os.path.join(HTML_CACHE_DIR, f"{team_name.replace(' ', '_')}_{season}.html")
+    validators = etags.get(url) if os.path.exists(cache_path) else None
+    try:
+        # Match-log pages are server-rendered, so the browser is only needed when the table is missing
+        html_content, new_validators = fetch_static(client, url, MAX_RETRIES, RETRY_DELAY, validators=validators, limiter=LIMITER)
+    except NotModified:
+        logging.info(f"Match log for {team_name}, {season} is unchanged since the last run. Using the cached page.")
+        with open(cache_path, encoding='utf-8') as f:
+            html_content, new_validators = f.read(), None
+    else:
+        if not html_content or 'matchlogs_for' not in html_content:
+            logging.info(f"Match log not in the static HTML for {team_name}, {season}. Falling back to Selenium.")
+            html_content, new_validators = fetch_with_pool(drivers, url), {}
+
+    if html_content:
+        logging.info(f"Successfully fetched HTML for {team_name}, {season}")
+        if new_validators is not None:
+            os.makedirs(HTML_CACHE_DIR, exist_ok=True)
+            with open(cache_path, 'w', encoding='utf-8') as f:
+                f.write(html_content)
+            # Each task owns its URL's entry, so workers never write the same key.
+            # Browser-rendered pages carry no validators and are fetched in full next time.
+            if new_validators:
+                etags[url] = new_validators
+            else:
+                etags.pop(url, None)
+        # TODO: Parse and save data (to be implemented in next steps)
+    else:
+        logging.error(f"Failed to fetch HTML for {team_name}, {season}")
 
 def main():
     """Main execution loop for scraping H2H data."""
     logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
     os.makedirs(OUTPUT_DIR, exist_ok=True)
+    etags = load_etag_cache(ETAG_CACHE_FILE)
 
+    tasks = []
     for season in SEASONS_TO_SCRAPE:
-        logging.info(f"--- Starting H2H Scrape for Season: {season} ---")
+        logging.info(f"--- Collecting H2H pages for Season: {season} ---")
         for team_name, team_data in TEAMS_CONFIG.items():
             squad_id = team_data['id']
             team_slug = team_data['slug']
@@ -81,21 +197,24 @@ def main():
             else:
                 url = f"https://fbref.com/en/squads/{squad_id}/{season}/matchlogs/all_comps/{team_slug}-Match-Logs-All-Competitions"
 
-            logging.info(f"Scraping H2H data for: {team_name} from {url}")
-            html_content = get_html_with_selenium(url)
+            tasks.append((team_name, season, url))
 
-            if html_content:
-                logging.info(f"Successfully fetched HTML for {team_name}, {season}")
-                # TODO: Parse and save data (to be implemented in next steps)
-            else:
-                logging.error(f"Failed to fetch HTML for {team_name}, {season}")
-
-            # Human-like delay
-            human_delay = random.uniform(5, 10)
-            logging.info(f"Pausing for {human_delay:.2f} seconds to appear more human...")
-            time.sleep(human_delay)
+    # One pooled HTTP client shared by MAX_WORKERS workers, all paced by LIMITER. Browsers are only launched for pages whose
+    # match log isn't in the static HTML, then reused for every later fallback instead of one per URL.
+    drivers = queue.Queue()
+    for _ in range(MAX_WORKERS):
+        drivers.put(None)
+    try:
+        with create_http_client() as client, ThreadPoolExecutor(max_workers=MAX_WORKERS) as pool:
+            list(pool.map(lambda task: scrape_team_season(client, drivers, etags, *task), tasks))
+    finally:
+        while not drivers.empty():
+            driver = drivers.get()
+            if driver:
+                driver.quit()
+        save_etag_cache(ETAG_CACHE_FILE, etags)
 
     logging.info("--- H2H Scraping Core Engine Complete ---")
 
 if __name__ == '__main__':
-    main()
\ No newline at end of file
+    main()
@@ -1,209 +1,165 @@
 import time
-import random
+import numpy as np
 import pandas as pd
-from selenium import webdriver
-from selenium.webdriver.chrome.options import Options
-from selenium.webdriver.chrome.service import Service
-from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
-from selenium.common.exceptions import TimeoutException, NoSuchElementException
-from webdriver_manager.chrome import ChromeDriverManager
+import httpx
 import logging
 import os
-import re
-import functools
+from data_pipelines._http_utils import RateLimiter, backoff_delay, create_http_client
 
 # Configure logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
 # Configuration
 SEASON = "2024-2025"  # Specify the season
-FIXTURES_FILE = f"fbref_data/fbref_fixtures_{SEASON}.csv"
+FIXTURES_FILE = f"fbref_data/fixtures/season={SEASON}/fixtures.parquet"  # Written by fbref_harvester.py
 OUTPUT_DIR = "sofascore_match_data"
-SOFASCORE_SEARCH_URL = "https://www.sofascore.com/search"
-
-def setup_driver():
-    """Setup Selenium WebDriver with Ghost Protocol configuration."""
-    chrome_options = Options()
-    chrome_options.add_argument("--headless")
-    chrome_options.add_argument("--no-sandbox")
-    chrome_options.add_argument("--disable-dev-shm-usage")
-    chrome_options.add_argument("--disable-blink-features=AutomationControlled")
-    chrome_options.add_experimental_option("excludeSwitches", ["enable-automation"])
-    chrome_options.add_experimental_option('useAutomationExtension', False)
-    chrome_options.add_argument("--user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36")
-
-    service = Service(ChromeDriverManager().install())
-    driver = webdriver.Chrome(service=service, options=chrome_options)
-    driver.execute_script("Object.defineProperty(navigator, 'webdriver', {get: () => undefined})")
-    return driver
-
-def random_delay(min_delay=1, max_delay=3):
-    """Add random delay."""
-    time.sleep(random.uniform(min_delay, max_delay))
-
-def retry_on_failure(max_retries=3, delay=5):
-    """Decorator to retry function on failure."""
-    def decorator(func):
-        @functools.wraps(func)
-        def wrapper(*args, **kwargs):
-            for attempt in range(max_retries):
-                try:
-                    return func(*args, **kwargs)
-                except Exception as e:
-                    logging.warning(f"Attempt {attempt + 1} failed: {e}")
-                    if attempt < max_retries - 1:
-                        time.sleep(delay)
-                    else:
-                        raise
-        return wrapper
-    return decorator
+SOFASCORE_API = "https://api.sofascore.com/api/v1"
+PREMIER_LEAGUE_ID = 17  # SofaScore's uniqueTournament id
+REQUESTS_PER_MINUTE = 60
+MAX_RETRIES = 3
+
+# FBREF's short team names, spelled the way SofaScore names the club
+TEAM_NAME_ALIASES = {
+    "Manchester Utd": "Manchester United",
+    "Newcastle Utd": "Newcastle United",
+    "Nott'ham Forest": "Nottingham Forest",
+    "Wolves": "Wolverhampton",
+}
+
+# Every API request goes through one limiter, instead of fixed sleeps between fixtures
+LIMITER = RateLimiter(REQUESTS_PER_MINUTE / 60)
+
+def fetch_json(client, path, max_retries=MAX_RETRIES):
+    """GET a SofaScore API path and return its JSON, or None if it's missing or keeps failing."""
+    url = f"{SOFASCORE_API}/{path}"
+    for attempt in range(max_retries):
+        LIMITER.wait()
+        try:
+            response = client.get(url)
+            if response.status_code == 404:
+                # Not every player has a heatmap, nor every event lineups
+                return None
+            response.raise_for_status()
+            return response.json()
+        except (httpx.HTTPError, ValueError) as e:
+            logging.warning(f"Attempt {attempt + 1} failed for {url}: {e}")
+            if attempt < max_retries - 1:
+                time.sleep(backoff_delay(e, attempt, 5))
+    return None
 
 def load_fixtures():
-    """Load fixtures from CSV."""
+    """Load fixtures from the FBREF harvester's Parquet dataset."""
     if not os.path.exists(FIXTURES_FILE):
         logging.error(f"Fixtures file {FIXTURES_FILE} not found.")
         return pd.DataFrame()
-    df = pd.read_csv(FIXTURES_FILE)
+    df = pd.read_parquet(FIXTURES_FILE)
     return df
 
-@retry_on_failure()
-def search_match_on_sofascore(driver, home_team, away_team, date):
-    """Search for match on SofaScore and return the URL."""
-    query = f"{home_team} vs {away_team} {date}"
-    driver.get(f"{SOFASCORE_SEARCH_URL}?q={query.replace(' ', '%20')}")
-    random_delay()
-
-    try:
-        # Wait for search results
-        results = WebDriverWait(driver, 10).until(
-            EC.presence_of_all_elements_located((By.CSS_SELECTOR, ".search-result"))  # Adjust selector
-        )
-        for result in results:
-            # Check if the result matches the date
-            if date in result.text:
-                link = result.find_element(By.TAG_NAME, "a").get_attribute("href")
-                return link
-    except Exception as e:
-        logging.warning(f"Search failed for {query}: {e}")
+def same_team(fbref_name, team):
+    """Whether a SofaScore team object is the club FBREF calls fbref_name."""
+    wanted = TEAM_NAME_ALIASES.get(fbref_name, fbref_name).lower()
+    names = [team.get('name', '').lower(), team.get('shortName', '').lower()]
+    return any(name and (wanted in name or name in wanted) for name in names)
+
+def search_match_on_sofascore(client, events_by_date, home_team, away_team, date):
+    """
+    Find the match's SofaScore event id among that day's football events. Each date's schedule
+    is fetched once and kept in events_by_date for the other fixtures played that day. A failed
+    fetch is not cached, so the next fixture on that date asks again.
+    """
+    if date not in events_by_date:
+        schedule = fetch_json(client, f"sport/football/scheduled-events/{date}")
+        if schedule is None:
+            logging.error(f"Could not fetch the SofaScore schedule for {date}; {home_team} vs {away_team} needs a rerun.")
+            return None
+        events_by_date[date] = schedule.get('events', [])
+    for event in events_by_date[date]:
+        tournament = event.get('tournament', {}).get('uniqueTournament', {})
+        if (tournament.get('id') == PREMIER_LEAGUE_ID and same_team(home_team, event.get('homeTeam', {}))
+                and same_team(away_team, event.get('awayTeam', {}))):
+            return event['id']
+    logging.warning(f"No SofaScore event found for {home_team} vs {away_team} on {date}")
     return None
 
-@retry_on_failure()
-def scrape_match_data(driver, match_url, home_team, away_team, date):
-    """Scrape data from a SofaScore match page."""
-    driver.get(match_url)
-    random_delay()
-
-    # Click Statistics tab
-    try:
-        stats_tab = WebDriverWait(driver, 10).until(
-            EC.element_to_be_clickable((By.XPATH, "//div[text()='Statistics']"))  # Adjust XPath
-        )
-        stats_tab.click()
-        random_delay()
-    except Exception as e:
-        logging.error(f"Failed to click Statistics tab: {e}")
+def scrape_match_data(client, event_id, home_team, away_team, date):
+    """Build the per-player table of a match from its lineups and each player's heatmap."""
+    lineups = fetch_json(client, f"event/{event_id}/lineups")
+    if not lineups:
+        logging.error(f"No lineups for event {event_id}")
         return pd.DataFrame()
 
-    # Extract formations
-    formations = extract_formations(driver)
+    formations = extract_formations(lineups)
 
-    # Extract player stats
     players_data = []
-    # Find all players, perhaps in lineup or stats sections
-    player_elements = driver.find_elements(By.CSS_SELECTOR, ".player-row")  # Adjust selector
-    for player_elem in player_elements:
-        player_name = player_elem.find_element(By.CSS_SELECTOR, ".player-name").text
-        # Click on player to get detailed stats
-        player_elem.click()
-        random_delay()
-
-        # Extract stats from tabs
-        stats = extract_player_stats(driver)
-
-        # Extract heatmap center
-        heatmap_center = extract_heatmap_center(driver)
-
-        # Combine
-        player_data = {
-            'player_name': player_name,
-            'home_team': home_team,
-            'away_team': away_team,
-            'date': date,
-            'home_formation': formations.get('home'),
-            'away_formation': formations.get('away'),
-            **stats,
-            **heatmap_center
-        }
-        players_data.append(player_data)
+    for side in ('home', 'away'):
+        for entry in lineups.get(side, {}).get('players', []):
+            stats = extract_player_stats(entry)
+            # Unused substitutes have no statistics and no heatmap
+            if not stats:
+                continue
+            player = entry['player']
+            heatmap = fetch_json(client, f"event/{event_id}/player/{player['id']}/heatmap")
+
+            player_data = {
+                'player_name': player.get('name'),
+                'home_team': home_team,
+                'away_team': away_team,
+                'date': date,
+                'home_formation': formations.get('home'),
+                'away_formation': formations.get('away'),
+                **stats,
+                **extract_heatmap_center(heatmap)
+            }
+            players_data.append(player_data)
 
     return pd.DataFrame(players_data)
 
-def extract_formations(driver):
+def extract_formations(lineups):
     """Extract starting formations."""
-    formations = {}
-    try:
-        # Assume formations are in specific elements
-        home_form = driver.find_element(By.CSS_SELECTOR, ".home-formation").text
-        away_form = driver.find_element(By.CSS_SELECTOR, ".away-formation").text
-        formations['home'] = home_form
-        formations['away'] = away_form
-    except:
-        pass
-    return formations
-
-def extract_player_stats(driver):
-    """Extract detailed player stats from all tabs."""
-    stats = {}
-    tabs = ['Attacking', 'Defending', 'Passing']  # Add more
-    for tab in tabs:
-        try:
-            tab_elem = driver.find_element(By.XPATH, f"//div[text()='{tab}']")
-            tab_elem.click()
-            random_delay()
-            # Scrape stats, e.g., xG, shots, etc.
-            # This is simplified; in reality, parse the stats elements
-            stats[f'{tab.lower()}_xg'] = driver.find_element(By.CSS_SELECTOR, ".xg-value").text
-            # Add more fields
-        except:
-            pass
-    return stats
-
-def extract_heatmap_center(driver):
-    """Extract center of gravity from heatmap."""
-    # This is tricky; assume heatmap is SVG or has data attributes
-    # For simplicity, return dummy values
-    # In reality, might need to execute JS to get coordinates
-    return {'heatmap_center_x': 50, 'heatmap_center_y': 50}  # Placeholder
-
-def save_match_csv(df, filename):
-    """Save match data to CSV."""
-    os.makedirs(OUTPUT_DIR, exist_ok=True)
-    path = os.path.join(OUTPUT_DIR, filename)
-    df.to_csv(path, index=False)
-    logging.info(f"Saved {filename}")
+    return {side: lineups.get(side, {}).get('formation') for side in ('home', 'away')}
+
+def extract_player_stats(entry):
+    """Extract a player's match statistics (rating, expectedGoals, totalPass, ...)."""
+    return dict(entry.get('statistics') or {})
+
+def extract_heatmap_center(heatmap):
+    """Extract center of gravity from heatmap: the mean of its touch coordinates (0-100 pitch scale)."""
+    points = [(point['x'], point['y']) for point in (heatmap or {}).get('heatmap', [])]
+    if not points:
+        return {'heatmap_center_x': np.nan, 'heatmap_center_y': np.nan}
+    center_x, center_y = np.mean(points, axis=0)
+    return {'heatmap_center_x': center_x, 'heatmap_center_y': center_y}
+
+def save_match_parquet(df, home_team, away_team, date):
+    """
+    Save match data as one file of a Hive-style dataset,
+    sofascore_match_data/season=<season>/home_team=<team>/<date>_vs_<away>.parquet, so every match
+    reads back in a single scan. Season and home team live in the path rather than in the file.
+    """
+    partition = os.path.join(OUTPUT_DIR, f"season={SEASON}", f"home_team={home_team}")
+    os.makedirs(partition, exist_ok=True)
+    path = os.path.join(partition, f"{date}_vs_{away_team}.parquet".replace(' ', '_'))
+    df.drop(columns='home_team').to_parquet(path, engine='pyarrow', compression='zstd', index=False)
+    logging.info(f"Saved {path}")
 
 def main():
-    driver = setup_driver()
     fixtures_df = load_fixtures()
     if fixtures_df.empty:
         return
+    fixture_cols = ['Home', 'Away', 'Date']  # Adjust column names
+    missing = [col for col in fixture_cols if col not in fixtures_df.columns]
+    if missing:
+        logging.error(f"Fixtures file {FIXTURES_FILE} is missing columns: {missing}")
+        return
 
-    try:
-        for _, row in fixtures_df.iterrows():
-            home_team = row['Home']  # Adjust column names
-            away_team = row['Away']
-            date = row['Date']
-            match_url = search_match_on_sofascore(driver, home_team, away_team, date)
-            if match_url:
-                match_df = scrape_match_data(driver, match_url, home_team, away_team, date)
+    events_by_date = {}
+    with create_http_client() as client:
+        for home_team, away_team, date in fixtures_df[fixture_cols].itertuples(index=False, name=None):
+            event_id = search_match_on_sofascore(client, events_by_date, home_team, away_team, date)
+            if event_id:
+                match_df = scrape_match_data(client, event_id, home_team, away_team, date)
                 if not match_df.empty:
-                    filename = f"{date}_{home_team}_vs_{away_team}.csv".replace(' ', '_')
-                    save_match_csv(match_df, filename)
-            random_delay(5, 10)
-    finally:
-        driver.quit()
+                    save_match_parquet(match_df, home_team, away_team, date)
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()